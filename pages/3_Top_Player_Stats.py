@@ -2,11 +2,13 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Any, Dict, List, Optional
 import logging
 
 # Import your API functions
-from utils.api import get_trending_players, verify_api_connection
+from utils.api import json_dumps_preview
+from utils.cached_api import cached_trending_players, cached_verify_api_connection, clear_trending_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,21 +17,26 @@ logger = logging.getLogger(__name__)
 def test_trending_api():
     """Test the trending players API using your wrapper"""
     try:
-        data = get_trending_players()
+        data = cached_trending_players()
         st.info("API Response received")
         
         if data and not data.get("error"):
             st.success("API call successful!")
+            # Reused by "Get Trending Players Data" instead of fetching again
+            st.session_state['trending_data'] = data
             st.write("Response type:", type(data))
             
             if isinstance(data, dict):
                 st.write("Response keys:", list(data.keys()))
-                st.json(data)
+                body, truncated = json_dumps_preview(data)
+                st.code(body, language="json")
+                if truncated:
+                    st.caption(f"Truncated {truncated:,} characters")
             elif isinstance(data, list):
                 st.write(f"Response list length: {len(data)}")
                 if data:
                     st.write("First item:", data[0])
-                st.json(data[:3])  # Show first 3 items
+                st.code(json_dumps_preview(data[:3])[0], language="json")  # Show first 3 items
             
             return data
         else:
@@ -40,10 +47,58 @@ def test_trending_api():
         st.error(f"Request failed: {str(e)}")
         return None
 
-def extract_player_stats_from_trending(trending_data) -> List[Dict]:
-    """Extract player statistics from trending players API response"""
-    players = []
+def _stat_paths(group: str, key: str) -> List[tuple]:
+    """Where a batting/bowling stat may live: nested under stats, under the group, or top-level"""
+    return [('stats', group, key), (group, key), (key,)]
+
+# Output field -> (source paths in priority order, default, numeric).
+# The first path holding a non-null value wins, so legitimate zeros are kept.
+PLAYER_SCHEMA = {
+    'name': ([('name',), ('playerName',), ('fullName',)], 'Unknown', False),
+    'team': ([('team',)], 'Unknown', False),
+    'country': ([('country',), ('team',)], 'Unknown', False),
+    'role': ([('role',)], 'Unknown', False),
+    
+    # Batting stats
+    'runs': (_stat_paths('batting', 'runs'), 0, True),
+    'balls_faced': (_stat_paths('batting', 'balls'), 0, True),
+    'fours': (_stat_paths('batting', 'fours'), 0, True),
+    'sixes': (_stat_paths('batting', 'sixes'), 0, True),
+    'strike_rate': (_stat_paths('batting', 'strikeRate'), 0, True),
+    'highest_score': (_stat_paths('batting', 'highestScore'), 0, False),
+    
+    # Bowling stats
+    'wickets': (_stat_paths('bowling', 'wickets'), 0, True),
+    'overs_bowled': (_stat_paths('bowling', 'overs'), 0, True),
+    'runs_conceded': (_stat_paths('bowling', 'runsConceded'), 0, True),
+    'economy_rate': (_stat_paths('bowling', 'economyRate'), 0, True),
+    'best_figures': (_stat_paths('bowling', 'bestFigures'), 'N/A', False),
+    
+    # General stats
+    'matches': ([('matches',)], 1, True),
+    'average': ([('average',)], 0, True),
+    'format': ([('format',)], 'Unknown', False),
+    'recent_form': ([('recentForm',)], 'Unknown', False),
+    'trending_score': ([('trendingScore',)], 0, True),
+    'rank': ([('rank',)], 0, True),
+}
+
+INTEGER_FIELDS = ['runs', 'balls_faced', 'fours', 'sixes', 'wickets', 'runs_conceded', 'matches', 'rank']
+
+def _map_field(flat: pd.DataFrame, paths: List[tuple], default: Any, numeric: bool) -> pd.Series:
+    """Row-wise first non-null value across `paths` in a json_normalize-flattened frame"""
+    present = [c for c in ('.'.join(path) for path in paths) if c in flat.columns]
+    if present:
+        values = flat[present].bfill(axis=1).iloc[:, 0]
+    else:
+        values = pd.Series(None, index=flat.index, dtype=object)
     
+    if numeric:
+        return pd.to_numeric(values, errors='coerce').fillna(default)
+    return values.where(values.notna(), default)
+
+def extract_player_stats_from_trending(trending_data) -> pd.DataFrame:
+    """Extract player statistics from trending players API response"""
     try:
         # Handle different possible response structures
         if isinstance(trending_data, list):
@@ -64,91 +119,53 @@ def extract_player_stats_from_trending(trending_data) -> List[Dict]:
                         break
                 else:
                     st.warning("Could not find player data in API response")
-                    return []
+                    return pd.DataFrame()
         else:
             st.error("Unexpected API response format")
-            return []
+            return pd.DataFrame()
         
         logger.info(f"Processing {len(raw_players)} players from trending data")
         
-        for player_data in raw_players:
-            if not isinstance(player_data, dict):
-                continue
-                
-            # Extract basic info
-            name = (player_data.get('name') or 
-                   player_data.get('playerName') or 
-                   player_data.get('fullName') or 'Unknown')
-            
-            # Extract stats - API structure may vary
-            stats = player_data.get('stats', {})
-            batting_stats = stats.get('batting', {}) if stats else player_data.get('batting', {})
-            bowling_stats = stats.get('bowling', {}) if stats else player_data.get('bowling', {})
-            
-            # Create normalized player record
-            player = {
-                'name': name,
-                'team': player_data.get('team', 'Unknown'),
-                'country': player_data.get('country') or player_data.get('team', 'Unknown'),
-                'role': player_data.get('role', 'Unknown'),
-                
-                # Batting stats
-                'runs': batting_stats.get('runs', 0) or player_data.get('runs', 0),
-                'balls_faced': batting_stats.get('balls', 0) or player_data.get('balls', 0),
-                'fours': batting_stats.get('fours', 0) or player_data.get('fours', 0),
-                'sixes': batting_stats.get('sixes', 0) or player_data.get('sixes', 0),
-                'strike_rate': batting_stats.get('strikeRate', 0) or player_data.get('strikeRate', 0),
-                'highest_score': batting_stats.get('highestScore', 0) or player_data.get('highestScore', 0),
-                
-                # Bowling stats
-                'wickets': bowling_stats.get('wickets', 0) or player_data.get('wickets', 0),
-                'overs_bowled': bowling_stats.get('overs', 0) or player_data.get('overs', 0),
-                'runs_conceded': bowling_stats.get('runsConceded', 0) or player_data.get('runsConceded', 0),
-                'economy_rate': bowling_stats.get('economyRate', 0) or player_data.get('economyRate', 0),
-                'best_figures': bowling_stats.get('bestFigures', 'N/A') or player_data.get('bestFigures', 'N/A'),
-                
-                # General stats
-                'matches': player_data.get('matches', 1),
-                'average': player_data.get('average', 0),
-                'format': player_data.get('format', 'Unknown'),
-                'recent_form': player_data.get('recentForm', 'Unknown'),
-                'trending_score': player_data.get('trendingScore', 0),
-                'rank': player_data.get('rank', 0)
-            }
-            
-            # Calculate missing values
-            if player['runs'] > 0 and player['balls_faced'] > 0 and player['strike_rate'] == 0:
-                player['strike_rate'] = round((player['runs'] / player['balls_faced']) * 100, 2)
-            
-            if player['overs_bowled'] > 0 and player['runs_conceded'] > 0 and player['economy_rate'] == 0:
-                player['economy_rate'] = round(player['runs_conceded'] / player['overs_bowled'], 2)
-            
-            players.append(player)
-            logger.debug(f"Added player: {name}")
+        records = [p for p in raw_players if isinstance(p, dict)]
+        if not records:
+            return pd.DataFrame()
+        
+        # Flatten nested stats once in pandas ("stats.batting.runs", "batting.runs", ...)
+        # instead of walking every player dict in Python
+        flat = pd.json_normalize(records)
+        df = pd.DataFrame({
+            field: _map_field(flat, paths, default, numeric)
+            for field, (paths, default, numeric) in PLAYER_SCHEMA.items()
+        })
+        df[INTEGER_FIELDS] = df[INTEGER_FIELDS].astype(int)
+        
+        # Calculate missing values
+        mask = (df.runs > 0) & (df.balls_faced > 0) & (df.strike_rate == 0)
+        df.loc[mask, 'strike_rate'] = (df.runs[mask] / df.balls_faced[mask] * 100).round(2)
         
-        logger.info(f"Successfully processed {len(players)} players")
-        return players
+        mask = (df.overs_bowled > 0) & (df.runs_conceded > 0) & (df.economy_rate == 0)
+        df.loc[mask, 'economy_rate'] = (df.runs_conceded[mask] / df.overs_bowled[mask]).round(2)
+        
+        logger.info(f"Successfully processed {len(df)} players")
+        return df
         
     except Exception as e:
         logger.error(f"Error processing trending players data: {str(e)}")
         st.error(f"Error processing player data: {str(e)}")
-        return []
+        return pd.DataFrame()
 
-def create_trending_chart(players_data: List[Dict], metric: str = 'trending_score') -> go.Figure:
+def create_trending_chart(players_df: pd.DataFrame, metric: str = 'trending_score') -> go.Figure:
     """Create chart for trending players"""
     try:
-        if not players_data:
+        if players_df.empty:
             return go.Figure().add_annotation(text="No trending data available", showarrow=False)
         
-        # Sort by the metric and take top 15
-        sorted_data = sorted([p for p in players_data if p.get(metric, 0) > 0], 
-                           key=lambda x: x.get(metric, 0), reverse=True)[:15]
+        # Top 15 by the metric (partial sort in pandas)
+        top = players_df[players_df[metric] > 0].nlargest(15, metric)
         
-        if not sorted_data:
+        if top.empty:
             return go.Figure().add_annotation(text=f"No {metric} data available", showarrow=False)
         
-        df = pd.DataFrame(sorted_data)
-        
         title_map = {
             'trending_score': 'Trending Players Score',
             'runs': 'Top Run Scorers',
@@ -156,24 +173,33 @@ def create_trending_chart(players_data: List[Dict], metric: str = 'trending_scor
             'strike_rate': 'Best Strike Rates',
             'economy_rate': 'Best Economy Rates'
         }
+        y_title = metric.replace('_', ' ').title()
         
-        fig = px.bar(
-            df, 
-            x="name", 
-            y=metric,
-            color="country",
-            title=title_map.get(metric, f"Top {metric}"),
-            hover_data=["team", "role", "matches"],
-            text=metric
-        )
+        # One go.Bar trace colored per country, skipping plotly.express' frame inspection
+        palette = px.colors.qualitative.Plotly
+        color_map = {c: palette[i % len(palette)] for i, c in enumerate(top['country'].unique())}
+        
+        fig = go.Figure(go.Bar(
+            x=top['name'],
+            y=top[metric],
+            text=top[metric],
+            marker_color=top['country'].map(color_map),
+            customdata=top[['country', 'team', 'role', 'matches']].to_numpy(),
+            hovertemplate=(
+                "<b>%{x}</b><br>Country: %{customdata[0]}<br>Team: %{customdata[1]}"
+                "<br>Role: %{customdata[2]}<br>Matches: %{customdata[3]}"
+                f"<br>{y_title}: %{{y}}<extra></extra>"
+            ),
+        ))
         
         fig.update_traces(textposition='outside', textfont_size=10)
         fig.update_layout(
+            title=title_map.get(metric, f"Top {metric}"),
             xaxis_tickangle=-45,
             height=500,
             xaxis_title="Player",
-            yaxis_title=metric.replace('_', ' ').title(),
-            showlegend=True
+            yaxis_title=y_title,
+            showlegend=False
         )
         
         return fig
@@ -181,6 +207,14 @@ def create_trending_chart(players_data: List[Dict], metric: str = 'trending_scor
         logger.error(f"Error creating chart: {str(e)}")
         return go.Figure().add_annotation(text="Chart creation error", showarrow=False)
 
+def get_trending_chart(filtered_df: pd.DataFrame, filter_key: tuple, metric: str = 'trending_score') -> go.Figure:
+    """create_trending_chart, memoized per session on the filter selection and metric"""
+    fig_cache = st.session_state.setdefault('_fig_cache', {})
+    key = (filter_key, metric)
+    if key not in fig_cache:
+        fig_cache[key] = create_trending_chart(filtered_df, metric)
+    return fig_cache[key]
+
 def main():
     st.set_page_config(
         page_title="Trending Cricket Players",
@@ -193,7 +227,7 @@ def main():
     # API Connection Status
     with st.sidebar:
         st.header("API Status")
-        if verify_api_connection():
+        if cached_verify_api_connection():
             st.success("✅ API Connected")
         else:
             st.error("❌ API Unavailable")
@@ -208,16 +242,20 @@ def main():
     if st.button("Get Trending Players Data", type="primary"):
         with st.spinner("Fetching trending players..."):
             try:
-                trending_data = get_trending_players()
+                # Read-through: reuse the payload the API test already fetched
+                trending_data = st.session_state.get('trending_data')
+                if trending_data is None:
+                    trending_data = cached_trending_players()
                 
                 if trending_data and not trending_data.get("error"):
                     st.success("API call successful!")
                     
                     # Store in session state
                     st.session_state['trending_data'] = trending_data
-                    st.session_state['players_data'] = extract_player_stats_from_trending(trending_data)
+                    st.session_state['players_df'] = extract_player_stats_from_trending(trending_data)
+                    st.session_state['_fig_cache'] = {}
                     
-                    st.info(f"Processed {len(st.session_state['players_data'])} players")
+                    st.info(f"Processed {len(st.session_state['players_df'])} players")
                 else:
                     st.error("Failed to fetch trending players data")
                     
@@ -225,8 +263,8 @@ def main():
                 st.error(f"Failed to fetch data: {str(e)}")
     
     # Display data if available
-    if 'players_data' in st.session_state and st.session_state['players_data']:
-        players_data = st.session_state['players_data']
+    if 'players_df' in st.session_state and not st.session_state['players_df'].empty:
+        players_df = st.session_state['players_df']
         
         st.markdown("---")
         
@@ -234,46 +272,45 @@ def main():
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_players = len(players_data)
+            total_players = len(players_df)
             st.metric("Total Players", total_players)
         
         with col2:
-            countries = len(set(p['country'] for p in players_data))
+            countries = players_df['country'].nunique()
             st.metric("Countries", countries)
         
         with col3:
-            total_runs = sum(p.get('runs', 0) for p in players_data)
+            total_runs = int(players_df['runs'].sum())
             st.metric("Total Runs", f"{total_runs:,}")
         
         with col4:
-            total_wickets = sum(p.get('wickets', 0) for p in players_data)
+            total_wickets = int(players_df['wickets'].sum())
             st.metric("Total Wickets", total_wickets)
         
         # Filters
         with st.sidebar:
             st.header("Filters")
             
-            countries = sorted(list(set(p['country'] for p in players_data)))
+            countries = np.sort(players_df['country'].dropna().unique()).tolist()
             selected_countries = st.multiselect("Countries", countries, default=countries)
             
-            roles = sorted(list(set(p['role'] for p in players_data if p['role'] != 'Unknown')))
+            roles = np.sort(players_df.loc[players_df['role'] != 'Unknown', 'role'].dropna().unique()).tolist()
             selected_roles = st.multiselect("Roles", roles, default=roles)
             
-            formats = sorted(list(set(p['format'] for p in players_data if p['format'] != 'Unknown')))
+            formats = np.sort(players_df.loc[players_df['format'] != 'Unknown', 'format'].dropna().unique()).tolist()
             if formats:
                 selected_formats = st.multiselect("Formats", formats, default=formats)
             else:
                 selected_formats = []
         
         # Apply filters
-        filtered_data = [
-            p for p in players_data 
-            if (p['country'] in selected_countries and 
-                p['role'] in selected_roles and
-                (not selected_formats or p['format'] in selected_formats))
-        ]
+        mask = players_df['country'].isin(selected_countries) & players_df['role'].isin(selected_roles)
+        if selected_formats:
+            mask &= players_df['format'].isin(selected_formats)
+        filtered_df = players_df[mask]
+        filter_key = (tuple(sorted(selected_countries)), tuple(sorted(selected_roles)), tuple(sorted(selected_formats)))
         
-        if not filtered_data:
+        if filtered_df.empty:
             st.warning("No players match the selected filters")
             return
         
@@ -286,28 +323,29 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                fig_trending = create_trending_chart(filtered_data, 'trending_score')
+                fig_trending = get_trending_chart(filtered_df, filter_key, 'trending_score')
                 st.plotly_chart(fig_trending, use_container_width=True)
             
             with col2:
                 # Top performers table
-                trending_players = sorted([p for p in filtered_data if p.get('trending_score', 0) > 0], 
-                                        key=lambda x: x.get('trending_score', 0), reverse=True)[:10]
+                trending_players = filtered_df[filtered_df['trending_score'] > 0].nlargest(10, 'trending_score')
                 
-                if trending_players:
+                if not trending_players.empty:
                     st.markdown("**Top 10 Trending Players**")
-                    for i, player in enumerate(trending_players, 1):
-                        st.write(f"{i}. **{player['name']}** ({player['country']}) - Score: {player.get('trending_score', 0)}")
+                    for i, player in enumerate(trending_players.itertuples(index=False), 1):
+                        st.write(f"{i}. **{player.name}** ({player.country}) - Score: {player.trending_score}")
         
         # Rest of your tabs implementation...
         
         # Refresh button
         st.markdown("---")
         if st.button("Refresh Data"):
+            clear_trending_cache()
             if 'trending_data' in st.session_state:
                 del st.session_state['trending_data']
-            if 'players_data' in st.session_state:
-                del st.session_state['players_data']
+            if 'players_df' in st.session_state:
+                del st.session_state['players_df']
+            st.session_state.pop('_fig_cache', None)
             st.rerun()
     
     else:
@@ -2,10 +2,16 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
+import io
+import json
 from typing import Dict, Tuple, Optional
 
 try:
-    from utils.sql_queries import QUERIES
+    from utils.sql_queries import (
+        QUERIES, QUERIES_COMBINED, COMBINED_BY_QUERY, Slice,
+        CACHEABLE_IDS, CACHEABLE_COMBINED, db_mtime, run_cached, run_query_11_split, mv_is_stale, MV_FALLBACK,
+        ensure_indexes, ensure_is_home, ensure_role_counts, get_prepared, refresh_mv, run_report, run_all, verify_plans,
+    )
 except ImportError:
     st.error("Cannot import QUERIES from utils.sql_queries")
     st.stop()
@@ -16,6 +22,11 @@ except ImportError:
     st.error("Cannot import database connection from utils.db_connection")
     st.stop()
 
+try:
+    import connectorx as cx  # optional: reads results straight into Arrow columns
+except ImportError:
+    cx = None
+
 st.set_page_config(
     page_title="SQL Analytics - Cricket Database", 
     
@@ -25,21 +36,87 @@ st.set_page_config(
 st.title("SQL Analytics")
 st.markdown("Execute predefined and custom SQL queries on the cricket database")
 
-def execute_sql_query(query: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+def get_db_path() -> str:
+    database_url = os.getenv("DATABASE_URL", "sqlite:///cricket.db")
+    
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "")
+    return "cricket.db"
+
+@st.cache_resource
+def get_conn() -> sqlite3.Connection:
+    """Single long-lived SQLite connection shared by all sessions"""
+    # sqlite3 keeps compiled statements in a per-connection LRU keyed by SQL text;
+    # with bound parameters, re-running a query with new values skips the re-prepare
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA cache_size=-64000")  # 64 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+    ensure_is_home(conn)
+    ensure_role_counts(conn)
+    ensure_indexes(conn)
+    refresh_mv(conn)
+    verify_plans(conn)  # logs any query that lost its index
+    return conn
+
+def _execute_sql_query_uncached(query: str, params=None) -> pd.DataFrame:
+    # connectorx can't bind parameters, so parameterized queries go straight to sqlite3
+    if cx is not None and not params:
+        try:
+            table = cx.read_sql(f"sqlite://{os.path.abspath(get_db_path())}", query, return_type="arrow")
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except Exception:
+            pass  # connectorx only handles plain SELECTs; fall back to sqlite3
+    
+    conn = get_conn()
+    # Commit/rollback like the old per-query connection did, but keep it open
+    with conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+# Keyed by the SQL text and parameters. Exceptions are not cached, so a failing query is retried on the next click.
+_execute_sql_query_cached = st.cache_data(ttl=300, show_spinner=False)(_execute_sql_query_uncached)
+
+def execute_sql_query(query: str, params=None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
     try:
-        database_url = os.getenv("DATABASE_URL", "sqlite:///cricket.db")
-        
-        if database_url.startswith("sqlite:///"):
-            db_path = database_url.replace("sqlite:///", "")
-        else:
-            db_path = "cricket.db"
-        
-        with sqlite3.connect(db_path) as conn:
-            df = pd.read_sql_query(query, conn)
-            return df, None
+        return _execute_sql_query_cached(query, params), None
     except Exception as e:
         return None, str(e)
 
+def slice_combined(df: pd.DataFrame, part: Slice) -> pd.DataFrame:
+    if part.where:
+        df = df.query(part.where)
+    if part.order_by:
+        df = df.sort_values(part.order_by, kind="stable")
+    return df[list(part.columns)].rename(columns=part.columns).reset_index(drop=True)
+
+def run_predefined_query(query_id: int) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    # Queries that share a scan run the combined SQL once (its result is cached
+    # like any other) and cut this query's rows/columns out of it
+    combined = COMBINED_BY_QUERY.get(query_id)
+    key = combined or query_id
+    if key in CACHEABLE_IDS or key in CACHEABLE_COMBINED:
+        try:
+            stale = (query_id == 11 or query_id in MV_FALLBACK) and mv_is_stale(get_conn())
+            # Stats changed since the summary tables were built: aggregate player_stats directly
+            if stale and query_id == 11:
+                columns, rows = run_query_11_split(get_db_path())
+            elif stale:
+                with get_conn() as conn:
+                    cur = conn.execute(*MV_FALLBACK[query_id])
+                    columns, rows = [d[0] for d in cur.description], cur.fetchall()
+            else:
+                columns, rows = run_cached(get_conn(), key, db_mtime(get_db_path()))
+        except Exception as e:
+            return None, str(e)
+        df, error = pd.DataFrame(list(rows), columns=list(columns)), None
+    elif combined:
+        df, error = execute_sql_query(QUERIES_COMBINED[combined].sql, QUERIES_COMBINED[combined].params or None)
+    else:
+        return execute_sql_query(*get_prepared(query_id))
+    if error or not combined:
+        return df, error
+    return slice_combined(df, QUERIES_COMBINED[combined].slices[query_id]), None
+
 def display_query_results(df: pd.DataFrame, query_title: str):
     if df is not None and not df.empty:
         st.success(f"Query executed successfully - {len(df)} rows returned")
@@ -50,7 +127,8 @@ def display_query_results(df: pd.DataFrame, query_title: str):
         with col2:
             st.metric("Columns", len(df.columns))
         with col3:
-            st.metric("Size", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+            # Shallow count: deep=True would walk every string cell just for this metric
+            st.metric("Approx size", f"{df.memory_usage(deep=False).sum() / 1024:.1f} KB")
         
         st.dataframe(
             df,
@@ -59,19 +137,49 @@ def display_query_results(df: pd.DataFrame, query_title: str):
         )
         
         if st.button(f"Download {query_title} Results"):
-            csv = df.to_csv(index=False)
+            file_stem = f"cricket_query_{query_title.lower().replace(' ', '_')}"
+            
+            # Encode straight into a bytes buffer instead of building a str first
+            csv_buf = io.BytesIO()
+            df.to_csv(csv_buf, index=False, encoding="utf-8")
             st.download_button(
                 label="Download as CSV",
-                data=csv,
-                file_name=f"cricket_query_{query_title.lower().replace(' ', '_')}.csv",
+                data=csv_buf.getvalue(),
+                file_name=f"{file_stem}.csv",
                 mime="text/csv"
             )
+            
+            try:
+                parquet_buf = io.BytesIO()
+                df.to_parquet(parquet_buf, engine="pyarrow", compression="zstd", index=False)
+                st.download_button(
+                    label="Download as Parquet",
+                    data=parquet_buf.getvalue(),
+                    file_name=f"{file_stem}.parquet",
+                    mime="application/octet-stream"
+                )
+            except ImportError:
+                pass  # Parquet export needs pyarrow
     else:
         st.warning("Query returned no results")
 
+def clear_results_cache() -> None:
+    _execute_sql_query_cached.clear()
+    run_cached.cache_clear()
+
+def refresh_summary_tables() -> None:
+    refresh_mv(get_conn())
+    clear_results_cache()
+
+with st.sidebar:
+    st.button("Clear results cache", on_click=clear_results_cache,
+              help="Query results are cached for 5 minutes; clear to re-run against the database")
+    st.button("Refresh summary tables", on_click=refresh_summary_tables,
+              help="Rebuild the player_stats roll-ups behind queries 11, 20 and 21 after loading new stats")
+
 st.header("Predefined Queries")
 
-query_options = {f"{k}: {v[0]}": k for k, v in QUERIES.items()}
+query_options = {f"{k}: {v.title}": k for k, v in QUERIES.items()}
 selected_query = st.selectbox(
     "Choose a query",
     ["Custom Query"] + list(query_options.keys()),
@@ -80,12 +188,17 @@ selected_query = st.selectbox(
 
 if selected_query != "Custom Query":
     query_id = query_options[selected_query]
-    query_title, predefined_sql = QUERIES[query_id]
+    query = QUERIES[query_id]
     
-    st.markdown(f"**Selected:** {query_title}")
+    st.markdown(f"**Selected:** {query.title}")
     
     with st.expander("Preview Query"):
-        st.code(predefined_sql, language="sql")
+        if query.is_placeholder:
+            st.caption(query.note)
+        else:
+            st.code(query.sql, language="sql")
+            if query.params:
+                st.caption(f"Parameters: {', '.join(map(repr, query.params))}")
 
 if selected_query == "Custom Query":
     st.subheader("Custom SQL Query")
@@ -102,6 +215,12 @@ LIMIT 10;""",
         height=150
     )
     
+    params_text = st.text_input(
+        "Parameters (JSON, optional)",
+        placeholder='["ODI", 10] for ? placeholders, or {"fmt": "ODI"} for :fmt',
+        help="Bind values instead of editing literals so the prepared statement is reused"
+    )
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         execute_custom = st.button("Execute Query", type="primary")
@@ -121,8 +240,18 @@ LIMIT 10;""",
                     st.error("SQL syntax validation failed")
     
     if execute_custom and custom_sql.strip():
+        params = None
+        if params_text.strip():
+            try:
+                params = json.loads(params_text)
+                if not isinstance(params, (list, dict)):
+                    raise ValueError
+            except ValueError:
+                st.error("Parameters must be a JSON list or object")
+                st.stop()
+        
         with st.spinner("Executing custom query..."):
-            df, error = execute_sql_query(custom_sql)
+            df, error = execute_sql_query(custom_sql, params)
             
             if error:
                 st.error(f"Query Error: {error}")
@@ -132,25 +261,63 @@ LIMIT 10;""",
 
 else:
     query_id = query_options[selected_query]
-    query_title, predefined_sql = QUERIES[query_id]
+    query = QUERIES[query_id]
     
-    st.subheader(f"{query_title}")
+    st.subheader(f"{query.title}")
     
     with st.expander("View SQL Query", expanded=False):
-        st.code(predefined_sql, language="sql")
+        if query.is_placeholder:
+            st.caption(query.note)
+        else:
+            st.code(query.sql, language="sql")
+            if query.params:
+                st.caption(f"Parameters: {', '.join(map(repr, query.params))}")
     
     if st.button("Execute Query", type="primary"):
-        with st.spinner(f"Executing: {query_title}..."):
-            df, error = execute_sql_query(predefined_sql)
+        if query.is_placeholder:
+            # Nothing to run: answer from the stored note instead of a SQLite round-trip
+            display_query_results(pd.DataFrame({"note": [query.note]}), query.title)
+        else:
+            with st.spinner(f"Executing: {query.title}..."):
+                df, error = run_predefined_query(query_id)
             
-            if error:
-                st.error(f"Query Error: {error}")
-                if "no such table" in error.lower():
-                    st.info("This query requires tables that may not exist yet. Try seeding the database first.")
-                elif "no such column" in error.lower():
-                    st.info("This query requires columns that may not exist in the current schema.")
-            else:
-                display_query_results(df, query_title)
+                if error:
+                    st.error(f"Query Error: {error}")
+                    if "no such table" in error.lower():
+                        st.info("This query requires tables that may not exist yet. Try seeding the database first.")
+                    elif "no such column" in error.lower():
+                        st.info("This query requires columns that may not exist in the current schema.")
+                else:
+                    display_query_results(df, query.title)
+
+st.divider()
+st.subheader("Reports")
+st.caption("**Player stats report:** queries 3, 9, 18 and 21 in one statement; the player_stats/players join is scanned once for all four.")
+st.caption("**All queries:** every non-placeholder query in one batched script.")
+
+if st.button("Run Player Stats Report"):
+    with st.spinner("Running player stats report..."):
+        try:
+            conn = get_conn()
+            with conn:
+                report = run_report(conn)
+        except Exception as e:
+            st.error(f"Report Error: {e}")
+        else:
+            for qid, (columns, rows) in report.items():
+                st.markdown(f"**{qid}.** {QUERIES[qid].title}")
+                st.dataframe(pd.DataFrame(rows, columns=columns), use_container_width=True)
+
+if st.button("Run All Queries"):
+    with st.spinner("Running every predefined query..."):
+        try:
+            all_results = run_all(get_conn())
+        except Exception as e:
+            st.error(f"Query Error: {e}")
+        else:
+            for qid, (columns, rows) in all_results.items():
+                with st.expander(f"{qid}: {QUERIES[qid].title} ({len(rows)} rows)"):
+                    st.dataframe(pd.DataFrame(rows, columns=columns), use_container_width=True)
 
 st.divider()
 st.subheader("Available Query Categories")
@@ -167,7 +334,7 @@ for category, query_ids in query_categories.items():
     with st.expander(f"{category} ({len(query_ids)} queries)"):
         for qid in query_ids:
             if qid in QUERIES:
-                title, _ = QUERIES[qid]
+                title = QUERIES[qid].title
                 st.markdown(f"**{qid}.** {title}")
 
 st.divider()
@@ -1,59 +1,164 @@
 import streamlit as st
-from typing import List, Optional
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select, text
-from utils.db_connection import SessionLocal
+from sqlalchemy import select, delete, update, func, bindparam, lambda_stmt
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+from utils.db_connection import SessionLocal, ReadOnlySessionLocal
 from utils.models import Player
 
 # ---- Helpers ----
 ROLES = ["Batsman", "Bowler", "All-rounder", "Wicket-keeper"]
+DELETE_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 1000
+PAGE_SIZE = 50
+STREAM_CHUNK_SIZE = 500
+PLAYER_COLUMNS = ["id", "name", "country", "role", "batting_style", "bowling_style"]
+PLAYER_LABELS = {
+    "id": "ID",
+    "name": "Name",
+    "country": "Country",
+    "role": "Role",
+    "batting_style": "Batting Style",
+    "bowling_style": "Bowling Style",
+}
+
+# Input normalization happens in SQL: every write binds the raw values as in_<column>
+# and the statement trims them (optional styles: blank -> NULL), so single and bulk
+# writes share one statement shape and bulk rows need no Python cleanup pass.
+PLAYER_INPUT_VALUES = {
+    "name": func.trim(bindparam("in_name")),
+    "country": func.trim(bindparam("in_country")),
+    "role": func.trim(bindparam("in_role")),
+    "batting_style": func.nullif(func.trim(bindparam("in_batting_style")), ""),
+    "bowling_style": func.nullif(func.trim(bindparam("in_bowling_style")), ""),
+}
+
+def player_params(row: dict) -> dict:
+    return {f"in_{col}": row.get(col) for col in PLAYER_INPUT_VALUES}
 
 def get_db() -> Session:
     return SessionLocal()
 
-def list_players(db: Session, name_q: Optional[str] = None, country_q: Optional[str] = None, role_q: Optional[str] = None) -> List[Player]:
-    stmt = select(Player)
+# Listing statements are lambda_stmt chains: SQLAlchemy caches the compiled SQL per
+# combination of steps (keyed on the lambdas' code), and the filter values travel as
+# bound parameters, so changing a search term never recompiles the statement.
+
+def player_filters(name_q: Optional[str] = None, country_q: Optional[str] = None, role_q: Optional[str] = None) -> Tuple[List[Callable], dict]:
+    """WHERE steps to add to a lambda_stmt, plus the values for their bound parameters"""
+    steps, params = [], {}
     if name_q:
-        stmt = stmt.where(Player.name.ilike(f"%{name_q.strip()}%"))
+        steps.append(lambda s: s.where(func.lower(Player.name).like(bindparam("name_q"))))
+        params["name_q"] = f"%{name_q.strip().lower()}%"
     if country_q:
-        stmt = stmt.where(Player.country.ilike(f"%{country_q.strip()}%"))
+        steps.append(lambda s: s.where(func.lower(Player.country).like(bindparam("country_q"))))
+        params["country_q"] = f"%{country_q.strip().lower()}%"
     if role_q and role_q != "All":
-        stmt = stmt.where(Player.role == role_q)
-    return db.execute(stmt).scalars().all()
-
-def create_player(db: Session, *, name: str, country: str, role: str, batting_style: Optional[str], bowling_style: Optional[str]) -> Player:
-    player = Player(
-        name=name.strip(),
-        country=country.strip(),
-        role=role.strip(),
-        batting_style=(batting_style or "").strip() or None,
-        bowling_style=(bowling_style or "").strip() or None,
-    )
-    db.add(player)
+        steps.append(lambda s: s.where(Player.role == bindparam("role_q")))
+        params["role_q"] = role_q
+    return steps, params
+
+def players_query(name_q: Optional[str] = None, country_q: Optional[str] = None, role_q: Optional[str] = None, page: int = 0) -> Tuple[StatementLambdaElement, dict]:
+    # Core column select: plain rows, no Player instances/identity map for a read-only listing
+    stmt = lambda_stmt(lambda: select(
+        Player.id, Player.name, Player.country, Player.role, Player.batting_style, Player.bowling_style
+    ))
+    steps, params = player_filters(name_q, country_q, role_q)
+    for step in steps:
+        stmt += step
+    stmt += lambda s: s.order_by(Player.id).limit(bindparam("limit")).offset(bindparam("offset"))
+    params.update(limit=PAGE_SIZE, offset=page * PAGE_SIZE)
+    return stmt, params
+
+@st.cache_data(ttl=60, show_spinner=False)
+def list_players_cached(name_q: Optional[str] = None, country_q: Optional[str] = None, role_q: Optional[str] = None, page: int = 0) -> pd.DataFrame:
+    """One PAGE_SIZE slice of matching players as a DataFrame (built column-wise by read_sql), cached per filters and page"""
+    stmt, params = players_query(name_q, country_q, role_q, page)
+    with ReadOnlySessionLocal() as s:
+        df = pd.read_sql(stmt, con=s.connection(), params=params)
+    df[["batting_style", "bowling_style"]] = df[["batting_style", "bowling_style"]].fillna("")
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def count_players_cached(name_q: Optional[str] = None, country_q: Optional[str] = None, role_q: Optional[str] = None) -> int:
+    stmt = lambda_stmt(lambda: select(func.count()).select_from(Player))
+    steps, params = player_filters(name_q, country_q, role_q)
+    for step in steps:
+        stmt += step
+    with ReadOnlySessionLocal() as s:
+        return s.execute(stmt, params).scalar_one()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def delete_options_cached() -> Dict[str, int]:
+    """
+    {label: id} for every player, for the Delete tab's multiselect. Rows are
+    streamed STREAM_CHUNK_SIZE at a time (server-side cursor where the driver
+    has one) so only the labels are held, never the whole table's rows.
+    """
+    stmt = select(Player.id, Player.name, Player.country).order_by(Player.id)
+    with ReadOnlySessionLocal() as s:
+        result = s.execute(stmt, execution_options={"yield_per": STREAM_CHUNK_SIZE})
+        return {f"{pid} — {name} ({country})": pid for pid, name, country in result}
+
+def clear_player_caches() -> None:
+    list_players_cached.clear()
+    count_players_cached.clear()
+    delete_options_cached.clear()
+
+def create_player(db: Session, *, name: str, country: str, role: str, batting_style: Optional[str], bowling_style: Optional[str]) -> int:
+    stmt = Player.__table__.insert().values(**PLAYER_INPUT_VALUES).returning(Player.id)
+    params = player_params({
+        "name": name,
+        "country": country,
+        "role": role,
+        "batting_style": batting_style,
+        "bowling_style": bowling_style,
+    })
+    player_id = db.execute(stmt, params).scalar_one()
     db.commit()
-    db.refresh(player)
-    return player
-
-def update_player(db: Session, player_id: int, *, name: str, country: str, role: str, batting_style: Optional[str], bowling_style: Optional[str]) -> Optional[Player]:
-    player = db.get(Player, player_id)
-    if not player:
-        return None
-    player.name = name.strip()
-    player.country = country.strip()
-    player.role = role.strip()
-    player.batting_style = (batting_style or "").strip() or None
-    player.bowling_style = (bowling_style or "").strip() or None
+    return player_id
+
+def create_players_bulk(db: Session, rows: List[dict]) -> int:
+    # Core executemany per batch: no Player instances, no flush/refresh round-trips
+    stmt = Player.__table__.insert().values(**PLAYER_INPUT_VALUES)
+    count = 0
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = [player_params(r) for r in rows[start:start + INSERT_BATCH_SIZE]]
+        db.execute(stmt, batch)
+        count += len(batch)
+    if count:
+        db.commit()
+    return count
+
+def update_player(db: Session, player_id: int, *, name: str, country: str, role: str, batting_style: Optional[str], bowling_style: Optional[str]) -> Optional[RowMapping]:
+    # Single UPDATE ... RETURNING instead of get + flush + refresh
+    stmt = (
+        update(Player)
+        .where(Player.id == player_id)
+        .values(**PLAYER_INPUT_VALUES)
+        .returning(*(getattr(Player, col) for col in PLAYER_COLUMNS))
+        .execution_options(synchronize_session=False)
+    )
+    params = player_params({
+        "name": name,
+        "country": country,
+        "role": role,
+        "batting_style": batting_style,
+        "bowling_style": bowling_style,
+    })
+    row = db.execute(stmt, params).mappings().first()
     db.commit()
-    db.refresh(player)
-    return player
+    return row
 
 def delete_players(db: Session, ids: List[int]) -> int:
     count = 0
-    for pid in ids:
-        # Use direct SQL to avoid loading relationships
-        result = db.execute(text("DELETE FROM players WHERE id = :id"), {"id": pid})
-        if result.rowcount > 0:
-            count += 1
+    # One DELETE ... WHERE id IN (...) per batch; stays below SQL parameter limits
+    # and, like the raw SQL before, never loads relationships
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        stmt = delete(Player).where(Player.id.in_(batch)).execution_options(synchronize_session=False)
+        count += db.execute(stmt).rowcount
     if count:
         db.commit()
     return count
@@ -84,7 +189,7 @@ with tab_create:
             else:
                 db = get_db()
                 try:
-                    player = create_player(
+                    player_id = create_player(
                         db,
                         name=name,
                         country=country,
@@ -92,12 +197,51 @@ with tab_create:
                         batting_style=batting_style,
                         bowling_style=bowling_style,
                     )
-                    st.success(f"Player created with ID: {player.id}")
+                    clear_player_caches()
+                    st.success(f"Player created with ID: {player_id}")
                 except Exception as e:
                     st.error(f"Error creating player: {e}")
                 finally:
                     db.close()
 
+    with st.expander("Bulk import from CSV", expanded=False):
+        st.caption("Columns: **name, country, role** (required), batting_style, bowling_style (optional).")
+        upload = st.file_uploader("CSV file", type=["csv"])
+        if upload is not None:
+            try:
+                bulk_df = pd.read_csv(upload, dtype=str)
+            except Exception as e:
+                bulk_df = None
+                st.error(f"Could not read CSV: {e}")
+            if bulk_df is not None:
+                missing = {"name", "country", "role"} - set(bulk_df.columns)
+                if missing:
+                    st.error(f"Missing required column(s): {', '.join(sorted(missing))}")
+                else:
+                    # Same rules as the single-add form: name/country non-blank, role one of ROLES
+                    required = bulk_df[["name", "country", "role"]].apply(lambda col: col.str.strip())
+                    valid = (
+                        required["name"].fillna("").ne("")
+                        & required["country"].fillna("").ne("")
+                        & required["role"].isin(ROLES)
+                    )
+                    skipped = int((~valid).sum())
+                    bulk_df = bulk_df[valid]
+                    st.write(f"{len(bulk_df)} player(s) ready to import.")
+                    if skipped:
+                        st.warning(f"Skipping {skipped} row(s) with a blank name/country or a role outside {', '.join(ROLES)}.")
+                    if st.button("Import Players") and not bulk_df.empty:
+                        db = get_db()
+                        try:
+                            added = create_players_bulk(db, bulk_df.where(bulk_df.notna(), None).to_dict("records"))
+                            clear_player_caches()
+                            st.success(f"Imported {added} player(s).")
+                        except Exception as e:
+                            db.rollback()
+                            st.error(f"Error importing players: {e}")
+                        finally:
+                            db.close()
+
 # ---- List & Edit ----
 with tab_list:
     st.subheader("Players")
@@ -110,52 +254,47 @@ with tab_list:
         with fcol3:
             f_role = st.selectbox("Role", ["All"] + ROLES, index=0)
 
-    db = get_db()
     try:
-        players = list_players(db, f_name, f_country, f_role)
+        total = count_players_cached(f_name, f_country, f_role)
+        page_count = max(1, -(-total // PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1) - 1
+        players = list_players_cached(f_name, f_country, f_role, page)
+        if total:
+            st.caption(f"Showing {page * PAGE_SIZE + 1}–{page * PAGE_SIZE + len(players)} of {total} players")
     except Exception as e:
-        players = []
+        players = pd.DataFrame(columns=PLAYER_COLUMNS)
         st.error(f"Error loading players: {e}")
 
-    if not players:
+    if players.empty:
         st.info("No players found. Try adjusting filters or add a new player.")
     else:
         # Display as a simple table
-        data = [
-            {
-                "ID": p.id,
-                "Name": p.name,
-                "Country": p.country,
-                "Role": p.role,
-                "Batting Style": p.batting_style or "",
-                "Bowling Style": p.bowling_style or "",
-            }
-            for p in players
-        ]
-        st.dataframe(data, use_container_width=True, hide_index=True)
+        st.dataframe(players.rename(columns=PLAYER_LABELS), use_container_width=True, hide_index=True)
 
         st.divider()
         st.subheader("Edit Player")
 
-        id_options = [p.id for p in players]
+        id_options = players["id"].tolist()
         edit_id = st.selectbox("Select Player ID to Edit", id_options) if id_options else None
         if edit_id:
-            target = next((p for p in players if p.id == edit_id), None)
+            matches = players[players["id"] == edit_id]
+            target = matches.iloc[0].to_dict() if not matches.empty else None
             if target:
                 ecol1, ecol2 = st.columns(2)
                 with ecol1:
-                    e_name = st.text_input("Name*", value=target.name)
-                    e_country = st.text_input("Country*", value=target.country)
-                    e_role = st.selectbox("Role*", ROLES, index=ROLES.index(target.role) if target.role in ROLES else 0)
+                    e_name = st.text_input("Name*", value=target["name"])
+                    e_country = st.text_input("Country*", value=target["country"])
+                    e_role = st.selectbox("Role*", ROLES, index=ROLES.index(target["role"]) if target["role"] in ROLES else 0)
                 with ecol2:
-                    e_batting = st.text_input("Batting Style", value=target.batting_style or "")
-                    e_bowling = st.text_input("Bowling Style", value=target.bowling_style or "")
+                    e_batting = st.text_input("Batting Style", value=target["batting_style"])
+                    e_bowling = st.text_input("Bowling Style", value=target["bowling_style"])
 
                 if st.button("Save Changes"):
+                    db = get_db()
                     try:
                         updated = update_player(
                             db,
-                            target.id,
+                            int(target["id"]),
                             name=e_name,
                             country=e_country,
                             role=e_role,
@@ -163,6 +302,7 @@ with tab_list:
                             bowling_style=e_bowling,
                         )
                         if updated:
+                            clear_player_caches()
                             st.success("Player updated.")
                             st.rerun()
                         else:
@@ -175,25 +315,26 @@ with tab_list:
 # ---- Delete ----
 with tab_delete:
     st.subheader("Delete Players")
-    db = get_db()
     try:
-        all_players = list_players(db)
+        options = delete_options_cached()
     except Exception as e:
-        all_players = []
+        options = {}
         st.error(f"Error loading players: {e}")
 
-    if not all_players:
+    if not options:
         st.info("No players to delete.")
     else:
-        options = {f"{p.id} — {p.name} ({p.country})": p.id for p in all_players}
         to_delete_labels = st.multiselect("Select players to delete", list(options.keys()))
         to_delete_ids = [options[label] for label in to_delete_labels]
 
         if to_delete_ids and st.button("Confirm Delete"):
+            db = get_db()
             try:
                 removed = delete_players(db, to_delete_ids)
+                clear_player_caches()
                 st.success(f"Deleted {removed} player(s).")
                 st.rerun()
             except Exception as e:
                 st.error(f"Error deleting players: {e}")
-    db.close()
\ No newline at end of file
+            finally:
+                db.close()
\ No newline at end of file
@@ -1,8 +1,14 @@
 import os
+import hashlib
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import time
-from typing import Dict, List, Optional, Any
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
 from dotenv import load_dotenv
 
@@ -11,6 +17,65 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fastest available JSON codec: orjson, then ujson, then stdlib
+try:
+    import orjson
+
+    def json_loads(raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+    def json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def json_dumps_pretty(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+    def json_loads(raw: bytes) -> Any:
+        return _json.loads(raw)
+
+    def json_dumps(obj: Any) -> bytes:
+        return _json.dumps(obj).encode()
+
+    def json_dumps_pretty(obj: Any) -> str:
+        return _json.dumps(obj, indent=2, ensure_ascii=False)
+
+def json_dumps_preview(obj: Any, limit: int = 50_000) -> Tuple[str, int]:
+    """Pretty-printed JSON cut to `limit` characters; returns (text, characters dropped)"""
+    body = json_dumps_pretty(obj)
+    return body[:limit], max(len(body) - limit, 0)
+
+# Optional persistent cache so payloads survive process restarts
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# Last (etag, body sha1, parsed payload) per endpoint for conditional GETs
+_conditional_cache: Dict[str, Dict[str, Any]] = {}
+# Last (body sha1, extracted match list) per match-feed endpoint
+_extract_cache: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+
+LIVE_ENDPOINT = "matches/v1/live"
+UPCOMING_ENDPOINT = "matches/v1/upcoming"
+TRENDING_ENDPOINT = "stats/v1/player/trending"
+
+# Freshness windows (seconds) shared by the disk cache and the st.cache_data wrappers
+LIVE_TTL = 60
+UPCOMING_TTL = 600
+TRENDING_TTL = 300
+# Profiles, career stats, rankings and scorecards change at most a few times a day
+STATS_TTL = 300
+
+_disk_cache = diskcache.Cache(os.getenv("API_CACHE_DIR", ".apicache")) if diskcache else None
+
+# Shared workers for fetching independent feeds side by side over the pooled session
+_feed_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cricbuzz-feed")
+
 class CricbuzzAPIError(Exception):
     """Custom exception for Cricbuzz API errors"""
     pass
@@ -36,38 +101,90 @@ class CricbuzzAPI:
             self.headers = {}
             logger.warning("[CricbuzzAPI] RAPIDAPI_KEY not set. Falling back to sample data.")
 
+        # Keep-alive session: TLS to RapidAPI is negotiated once per pooled
+        # connection instead of on every call; urllib3 handles retries/backoff
+        # (and Retry-After on 429) that used to be a hand-rolled loop.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+
+    def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+             extra_headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """HTTP GET on the pooled session (retries in the adapter); returns the 200/304 response, or None on failure."""
+        url = f"{self.base_url}/{endpoint}"
+        try:
+            logger.info(f"[CricbuzzAPI] GET {endpoint}")
+            resp = self.session.get(url, headers=extra_headers, params=params, timeout=12)
+        except requests.RequestException as e:
+            logger.error(f"[CricbuzzAPI] request error: {e}")
+            logger.warning(f"[CricbuzzAPI] Failed to get data for {endpoint}")
+            return None
+        if resp.status_code in (200, 304):
+            return resp
+        logger.error(f"[CricbuzzAPI] {endpoint} failed {resp.status_code}: {resp.text[:200]}")
+        logger.warning(f"[CricbuzzAPI] Failed to get data for {endpoint}")
+        return None
+
     def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make HTTP GET with basic retry; returns fallback if disabled or on failure."""
         if not self.enabled:
             return {}
 
-        url = f"{self.base_url}/{endpoint}"
-        for attempt in range(3):
-            try:
-                logger.info(f"[CricbuzzAPI] GET {endpoint} (attempt {attempt+1})")
-                resp = requests.get(url, headers=self.headers, params=params, timeout=12)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return data if isinstance(data, dict) else {"data": data}
-                if resp.status_code == 429 and attempt < 2:
-                    # Exponential backoff on rate limit
-                    time.sleep(2 ** attempt)
-                    continue
-                logger.error(f"[CricbuzzAPI] {endpoint} failed {resp.status_code}: {resp.text[:200]}")
-            except requests.RequestException as e:
-                logger.error(f"[CricbuzzAPI] request error: {e}")
-                if attempt < 2:
-                    time.sleep(1.0)
+        resp = self._get(endpoint, params)
+        if resp is None or resp.status_code != 200:
+            return {}
+        return self._decode(endpoint, resp)
 
-        logger.warning(f"[CricbuzzAPI] Failed to get data for {endpoint}")
-        return {}
+    @staticmethod
+    def _decode(endpoint: str, resp: requests.Response) -> Dict[str, Any]:
+        """Decode a JSON body straight from bytes; non-dict payloads are wrapped as {"data": ...}."""
+        try:
+            data = json_loads(resp.content)
+        except ValueError as e:
+            logger.error(f"[CricbuzzAPI] {endpoint} returned invalid JSON: {e}")
+            return {}
+        return data if isinstance(data, dict) else {"data": data}
+
+    def _make_conditional_request(self, endpoint: str) -> Dict[str, Any]:
+        """
+        Conditional GET: sends If-None-Match with the last ETag and reuses the
+        previously parsed payload on 304, or when the body's SHA1 is unchanged
+        (for upstreams that don't emit ETags). Skips the JSON decode either way.
+        """
+        if not self.enabled:
+            return {}
+
+        cached = _conditional_cache.get(endpoint)
+        extra_headers = {"If-None-Match": cached["etag"]} if cached and cached["etag"] else None
+        resp = self._get(endpoint, extra_headers=extra_headers)
+        if resp is None:
+            return {}
+        if resp.status_code == 304:
+            logger.info(f"[CricbuzzAPI] {endpoint} not modified, reusing cached payload")
+            return cached["data"] if cached else {}
+
+        body = resp.content
+        digest = hashlib.sha1(body).hexdigest()
+        if cached and cached["digest"] == digest:
+            data = cached["data"]
+        else:
+            data = self._decode(endpoint, resp)
+        _conditional_cache[endpoint] = {"etag": resp.headers.get("ETag"), "digest": digest, "data": data}
+        return data
 
     def get_trending_players(self) -> Dict[str, Any]:
         """
         Get trending players data from Cricbuzz API.
         Returns raw API response without fallback data.
         """
-        return self._make_request("stats/v1/player/trending")
+        return self._make_request(TRENDING_ENDPOINT)
 
     def get_top_performers(self, category: str = "batting") -> Dict[str, Any]:
         """
@@ -112,21 +229,129 @@ class CricbuzzAPI:
 
 # ---- Module-level convenience (imported by pages) ----
 _api_instance: Optional[CricbuzzAPI] = None
+_api_instance_lock = threading.Lock()
 
 def get_api_instance() -> CricbuzzAPI:
+    """Process-wide client; Streamlit runs sessions on separate threads, so build it under a lock"""
     global _api_instance
     if _api_instance is None:
-        _api_instance = CricbuzzAPI()
+        with _api_instance_lock:
+            if _api_instance is None:
+                _api_instance = CricbuzzAPI()
     return _api_instance
 
+def _disk_read_through(key: str, ttl: int, fetch) -> Dict[str, Any]:
+    """
+    Serve a payload from the disk cache while it is younger than `ttl`, otherwise
+    fetch and store it. If the fetch fails (empty payload), fall back to the last
+    stored copy, however old. No-op when diskcache isn't installed.
+    """
+    if _disk_cache is None:
+        return fetch()
+
+    entry = _disk_cache.get(key)
+    if entry is not None:
+        fetched_at, raw = entry
+        if time.time() - fetched_at < ttl:
+            return json_loads(raw)
+
+    data = fetch()
+    if data:
+        _disk_cache.set(key, (time.time(), json_dumps(data)))
+        return data
+    if entry is not None:
+        logger.warning(f"[CricbuzzAPI] {key} unavailable, serving stale cached payload")
+        return json_loads(entry[1])
+    return data
+
+def clear_disk_cache() -> None:
+    if _disk_cache is not None:
+        _disk_cache.clear()
+
+def expire_disk_cache(*keys: str) -> None:
+    """Mark stored payloads as stale so the next read refetches; they stay available as the failure fallback"""
+    if _disk_cache is None:
+        return
+    for key in keys:
+        entry = _disk_cache.get(key)
+        if entry is not None:
+            _disk_cache.set(key, (0.0, entry[1]))
+
 # Live/Upcoming/Recent
 def get_live_matches() -> Dict[str, Any]:
     api = get_api_instance()
-    return api._make_request("matches/v1/live")
+    return _disk_read_through(LIVE_ENDPOINT, LIVE_TTL, lambda: api._make_conditional_request(LIVE_ENDPOINT))
 
 def get_upcoming_matches() -> Dict[str, Any]:
     api = get_api_instance()
-    return api._make_request("matches/v1/upcoming")
+    return _disk_read_through(UPCOMING_ENDPOINT, UPCOMING_TTL, lambda: api._make_conditional_request(UPCOMING_ENDPOINT))
+
+def extract_matches_from_response(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Extract the flat matchInfo list from a typeMatches/seriesMatches payload"""
+    matches = []
+    try:
+        if "typeMatches" in data:
+            for type_match in data["typeMatches"]:
+                if "seriesMatches" in type_match:
+                    for series_match in type_match["seriesMatches"]:
+                        if "seriesAdWrapper" in series_match:
+                            series_matches = series_match["seriesAdWrapper"].get("matches", [])
+                            for match in series_matches:
+                                if "matchInfo" in match:
+                                    matches.append(match["matchInfo"])
+        return matches
+    except Exception as e:
+        logger.error(f"Error extracting matches: {str(e)}")
+        return []
+
+def _get_match_list(endpoint: str) -> List[Dict[str, Any]]:
+    """
+    Fetch a match feed and extract its matches, skipping the nested walk when
+    the conditional-GET layer reports the same body hash as last time.
+    """
+    data = get_live_matches() if endpoint == LIVE_ENDPOINT else get_upcoming_matches()
+    entry = _conditional_cache.get(endpoint)
+    # The conditional-GET digest only describes the payload it parsed; a copy read
+    # back from the disk cache is a new object, so hash its serialized form instead
+    if entry is not None and entry["data"] is data:
+        digest = entry["digest"]
+    else:
+        digest = hashlib.sha1(json_dumps(data)).hexdigest()
+
+    memo = _extract_cache.get(endpoint)
+    if memo and memo[0] == digest:
+        return memo[1]
+    matches = extract_matches_from_response(data)
+    _extract_cache[endpoint] = (digest, matches)
+    return matches
+
+def get_live_match_list() -> List[Dict[str, Any]]:
+    return _get_match_list(LIVE_ENDPOINT)
+
+def get_upcoming_match_list() -> List[Dict[str, Any]]:
+    return _get_match_list(UPCOMING_ENDPOINT)
+
+MatchListResult = Tuple[List[Dict[str, Any]], Optional[Exception]]
+
+def _match_list_result(future: Future) -> MatchListResult:
+    try:
+        return future.result(), None
+    except Exception as e:
+        return [], e
+
+def get_match_lists(
+    fetch_live: Callable[[], List[Dict[str, Any]]] = get_live_match_list,
+    fetch_upcoming: Callable[[], List[Dict[str, Any]]] = get_upcoming_match_list,
+) -> Tuple[MatchListResult, MatchListResult]:
+    """
+    Live and upcoming match lists, fetched concurrently so a page render waits
+    for roughly one upstream round-trip instead of two. The fetchers can be
+    swapped for cached ones; a cache hit just returns at once. Each list comes
+    back as (matches, error) so one failing feed doesn't blank the other.
+    """
+    live = _feed_executor.submit(fetch_live)
+    upcoming = _feed_executor.submit(fetch_upcoming)
+    return _match_list_result(live), _match_list_result(upcoming)
 
 def get_recent_matches() -> Dict[str, Any]:
     api = get_api_instance()
@@ -138,22 +363,38 @@ def get_match_scorecard(match_id: int) -> Dict[str, Any]:
     return api._make_request(f"mcenter/v1/{match_id}/scard")
 
 # ---- Previously missing (added) ----
+@functools.lru_cache(maxsize=512)
+def _player_raw_cached(player_id: int, ttl_bucket: int) -> Dict[str, Any]:
+    # Many RapidAPI mirrors expose stats under this path:
+    data = get_api_instance()._make_request(f"stats/v1/player/{player_id}")
+    if not data:
+        # Raise so lru_cache doesn't remember the failure
+        raise CricbuzzAPIError(f"No data for player {player_id}")
+    return data
+
+def _player_raw(player_id: int) -> Dict[str, Any]:
+    """
+    One upstream call per player per STATS_TTL window, shared by get_player_stats,
+    get_player_info and get_player_career_stats("all"), which all read the same endpoint.
+    """
+    try:
+        return dict(_player_raw_cached(player_id, int(time.time() // STATS_TTL)))
+    except CricbuzzAPIError:
+        return {}
+
 def get_player_stats(player_id: int) -> Dict[str, Any]:
     """
     Returns aggregate player stats (tests/odis/t20is, etc).
     NOTE: This reads from API if configured, otherwise returns a safe fallback.
     """
-    api = get_api_instance()
-    # Many RapidAPI mirrors expose stats under this path:
-    return api._make_request(f"stats/v1/player/{player_id}")
+    return _player_raw(player_id)
 
 def get_player_info(player_id: int) -> Dict[str, Any]:
     """
     Returns core player profile info (name, role, battingStyle, bowlingStyle, intlTeam).
     If the upstream returns stats+info in one endpoint, we just reuse it and subset.
     """
-    api = get_api_instance()
-    data = api._make_request(f"stats/v1/player/{player_id}")
+    data = _player_raw(player_id)
     # Normalize to a simple predictable shape for the UI
     return {
         "id": player_id,
@@ -202,7 +443,7 @@ def get_team_players(team_id: int) -> Dict[str, Any]:
 def get_trending_players() -> Dict[str, Any]:
     """Get trending players data"""
     api = get_api_instance()
-    return api.get_trending_players()
+    return _disk_read_through(TRENDING_ENDPOINT, TRENDING_TTL, api.get_trending_players)
 
 def get_top_performers(category: str = "batting") -> Dict[str, Any]:
     """Get top performers by category"""
@@ -211,6 +452,8 @@ def get_top_performers(category: str = "batting") -> Dict[str, Any]:
 
 def get_player_career_stats(player_id: int, format_type: str = "all") -> Dict[str, Any]:
     """Get player career statistics"""
+    if format_type == "all":
+        return _player_raw(player_id)
     api = get_api_instance()
     return api.get_player_career_stats(player_id, format_type)
 
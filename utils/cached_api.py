@@ -0,0 +1,80 @@
+import threading
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from typing import Callable, Dict, List, Any, Tuple
+
+from utils.api import (
+    LIVE_ENDPOINT,
+    UPCOMING_ENDPOINT,
+    TRENDING_ENDPOINT,
+    LIVE_TTL,
+    UPCOMING_TTL,
+    TRENDING_TTL,
+    get_live_matches,
+    get_upcoming_matches,
+    get_match_lists,
+    MatchListResult,
+    get_live_match_list,
+    get_upcoming_match_list,
+    get_trending_players,
+    expire_disk_cache,
+)
+
+# Streamlit reruns every page script on each interaction; these wrappers keep
+# the Cricbuzz responses in the process-wide st.cache_data store so reruns (and
+# other sessions) are served without another RapidAPI round-trip.
+
+@st.cache_data(ttl=LIVE_TTL, show_spinner=False)
+def cached_live_matches() -> Dict[str, Any]:
+    return get_live_matches()
+
+@st.cache_data(ttl=UPCOMING_TTL, show_spinner=False)
+def cached_upcoming_matches() -> Dict[str, Any]:
+    return get_upcoming_matches()
+
+@st.cache_data(ttl=LIVE_TTL, show_spinner=False)
+def cached_live_match_list() -> List[Dict[str, Any]]:
+    return get_live_match_list()
+
+@st.cache_data(ttl=UPCOMING_TTL, show_spinner=False)
+def cached_upcoming_match_list() -> List[Dict[str, Any]]:
+    return get_upcoming_match_list()
+
+def _with_script_ctx(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Run fn on a worker thread under the calling script's context, as st.cache_data expects"""
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+    return run
+
+def cached_match_lists() -> Tuple[MatchListResult, MatchListResult]:
+    """
+    Both match lists as (matches, error), each cached with its own feed's TTL.
+    They are looked up side by side, so only the expired ones hit the API, and
+    those concurrently.
+    """
+    return get_match_lists(_with_script_ctx(cached_live_match_list), _with_script_ctx(cached_upcoming_match_list))
+
+@st.cache_data(ttl=TRENDING_TTL, show_spinner=False)
+def cached_trending_players() -> Dict[str, Any]:
+    return get_trending_players()
+
+def cached_verify_api_connection() -> bool:
+    """Same check as verify_api_connection, but reuses the cached live payload"""
+    data = cached_live_matches()
+    return bool(data) and not data.get("error")
+
+def clear_match_caches() -> None:
+    """Drop cached live/upcoming payloads so the next run refetches them"""
+    # The disk copies sit under st.cache_data and would otherwise be served again
+    expire_disk_cache(LIVE_ENDPOINT, UPCOMING_ENDPOINT)
+    cached_live_matches.clear()
+    cached_upcoming_matches.clear()
+    cached_live_match_list.clear()
+    cached_upcoming_match_list.clear()
+
+def clear_trending_cache() -> None:
+    """Drop the cached trending payload so the next run refetches it"""
+    expire_disk_cache(TRENDING_ENDPOINT)
+    cached_trending_players.clear()
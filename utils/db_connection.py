@@ -1,7 +1,8 @@
 import os
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from dotenv import load_dotenv
 from utils.models import Base
 
@@ -15,16 +16,41 @@ logger = logging.getLogger(__name__)
 # Get database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///cricbuzz_livestats.db")
 
-# Create engine
+def _engine_options(url: str) -> dict:
+    """
+    Pool settings per backend. Server databases get a larger pool shared by all
+    Streamlit sessions, with pre-ping/recycle so idle connections dropped by the
+    server are replaced. File SQLite keeps SQLAlchemy's default pool; an
+    in-memory database must stay on one connection (StaticPool) or each
+    checkout would see an empty database.
+    """
+    if "sqlite" in url:
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+
+# Create engine (module-level, so every page importing it shares one pool per process)
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False  # Set to True for SQL query logging
+    echo=False,  # Set to True for SQL query logging
+    **_engine_options(DATABASE_URL)
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions for list/search paths that only run Core selects: nothing is flushed
+# and nothing needs expiring, so the ORM write machinery is switched off
+ReadOnlySessionLocal = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
 def create_tables():
     """Create all database tables"""
     try:
@@ -70,10 +96,9 @@ def init_database():
 def test_connection():
     """Test database connection"""
     try:
-        db = get_db()
-        # Test query
-        db.execute("SELECT 1")
-        db.close()
+        # Test query (SQLAlchemy 2.x only executes textual SQL through text())
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
         logger.info("Database connection test successful")
         return True
     except Exception as e:
@@ -81,4 +106,4 @@ def test_connection():
         return False
 
 # Export commonly used items
-__all__ = ['engine', 'SessionLocal', 'get_db', 'get_db_session', 'create_tables', 'init_database', 'test_connection']
\ No newline at end of file
+__all__ = ['engine', 'SessionLocal', 'ReadOnlySessionLocal', 'get_db', 'get_db_session', 'create_tables', 'init_database', 'test_connection']
\ No newline at end of file
@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index, DDL, event, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+# All relationships are lazy="raise": touching one that wasn't loaded explicitly
+# (select(...).options(selectinload(...))) raises instead of issuing a query per row.
+
+# Trigram operator classes for the players name/country GIN indexes (Postgres only)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 class Team(Base):
     __tablename__ = 'teams'
     
@@ -16,9 +26,9 @@ class Team(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    home_matches = relationship("Match", foreign_keys="[Match.team1_id]", back_populates="team1")
-    away_matches = relationship("Match", foreign_keys="[Match.team2_id]", back_populates="team2")
-    players = relationship("Player", back_populates="team")
+    home_matches = relationship("Match", foreign_keys="[Match.team1_id]", back_populates="team1", lazy="raise")
+    away_matches = relationship("Match", foreign_keys="[Match.team2_id]", back_populates="team2", lazy="raise")
+    players = relationship("Player", back_populates="team", lazy="raise")
 
 class Venue(Base):
     __tablename__ = 'venues'
@@ -32,10 +42,13 @@ class Venue(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    matches = relationship("Match", back_populates="venue")
+    matches = relationship("Match", back_populates="venue", lazy="raise")
 
 class Player(Base):
     __tablename__ = 'players'
+    __table_args__ = (
+        Index("ix_players_role", "role"),
+    )
     
     id = Column(Integer, primary_key=True)
     cricbuzz_id = Column(Integer, unique=True, nullable=True)  # Optional Cricbuzz player ID
@@ -50,8 +63,18 @@ class Player(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    team = relationship("Team", back_populates="players")
-    stats = relationship("PlayerStats", back_populates="player")
+    team = relationship("Team", back_populates="players", lazy="raise")
+    stats = relationship("PlayerStats", back_populates="player", lazy="raise")
+
+# The CRUD page filters on lower(name)/lower(country) LIKE '%q%' with q folded in
+# Python. Index the folded expressions: B-tree for equality/prefix lookups, and on
+# Postgres a trigram GIN index that also serves the unanchored substring patterns.
+Index("ix_players_name_lower", func.lower(Player.name))
+Index("ix_players_country_lower", func.lower(Player.country))
+Index("ix_players_name_lower_trgm", func.lower(Player.name).label("name_lower"), postgresql_using="gin",
+      postgresql_ops={"name_lower": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+Index("ix_players_country_lower_trgm", func.lower(Player.country).label("country_lower"), postgresql_using="gin",
+      postgresql_ops={"country_lower": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
 
 class Match(Base):
     __tablename__ = 'matches'
@@ -77,10 +100,10 @@ class Match(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    team1 = relationship("Team", foreign_keys=[team1_id], back_populates="home_matches")
-    team2 = relationship("Team", foreign_keys=[team2_id], back_populates="away_matches")
-    venue = relationship("Venue", back_populates="matches")
-    player_stats = relationship("PlayerStats", back_populates="match")
+    team1 = relationship("Team", foreign_keys=[team1_id], back_populates="home_matches", lazy="raise")
+    team2 = relationship("Team", foreign_keys=[team2_id], back_populates="away_matches", lazy="raise")
+    venue = relationship("Venue", back_populates="matches", lazy="raise")
+    player_stats = relationship("PlayerStats", back_populates="match", lazy="raise")
 
 class PlayerStats(Base):
     __tablename__ = 'player_stats'
@@ -114,8 +137,8 @@ class PlayerStats(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    player = relationship("Player", back_populates="stats")
-    match = relationship("Match", back_populates="player_stats")
+    player = relationship("Player", back_populates="stats", lazy="raise")
+    match = relationship("Match", back_populates="player_stats", lazy="raise")
 
 # Export all models for easy import
 __all__ = ['Base', 'Team', 'Venue', 'Player', 'Match', 'PlayerStats']
\ No newline at end of file
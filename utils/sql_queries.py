@@ -1,71 +1,95 @@
-# 25 SQL practice queries mapped as {id: (title, sql)}
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class Query(NamedTuple):
+    title: str
+    sql: Optional[str]  # None for placeholders: answered from `note`, never sent to SQLite
+    note: Optional[str] = None
+    # Filter values bound to the `?` placeholders in sql, so the text (and the
+    # prepared statement sqlite3 caches for it) stays the same whatever they are
+    params: tuple = ()
+    # Regex that EXPLAIN QUERY PLAN's detail lines (joined by "; ") must match;
+    # checked by verify_plans() so a lost index shows up in the log, not as a slow page
+    plan: Optional[str] = None
+
+    @property
+    def is_placeholder(self) -> bool:
+        return self.sql is None
+
+# 25 SQL practice queries mapped as {id: Query}
 QUERIES = {
-1: ("Players from India",
+1: Query("Players from India",
 """
 SELECT name, role, batting_style, bowling_style
 FROM players
-WHERE country = 'India'
+WHERE country = ?
 ORDER BY name;
-"""),
-2: ("Matches in last 30 days",
+""", params=("India",), plan=r"USING COVERING INDEX idx_players_country_name"),
+2: Query("Matches in last 30 days",
 """
 SELECT m.description, t1.name AS team1, t2.name AS team2, v.name AS venue, v.city, m.start_time
 FROM matches m
 LEFT JOIN teams t1 ON m.team1_id = t1.id
 LEFT JOIN teams t2 ON m.team2_id = t2.id
 LEFT JOIN venues v ON m.venue_id = v.id
-WHERE m.start_time >= datetime('now', '-30 days')
+WHERE m.start_time >= datetime('now', ?)
 ORDER BY m.start_time DESC;
-"""),
-3: ("Top 10 ODI run scorers (sample schema)",
+""", params=("-30 days",), plan=r"SEARCH m USING INDEX idx_matches_start_time"),
+3: Query("Top 10 ODI run scorers (sample schema)",
 """
 SELECT p.name, ps.runs AS total_runs, ps.average AS batting_average
 FROM player_stats ps
 JOIN players p ON p.id = ps.player_id
-WHERE ps.format = 'ODI'
+WHERE ps.format = ?
 ORDER BY ps.runs DESC
-LIMIT 10;
-"""),
-4: ("Venues with capacity > 50k",
+LIMIT ?;
+""", params=("ODI", 10)),
+4: Query("Venues with capacity > 50k",
 """
 SELECT name, city, country, capacity
 FROM venues
-WHERE capacity > 50000
+WHERE capacity > ?
 ORDER BY capacity DESC;
-"""),
-5: ("Team wins (requires winner_team_id)",
+""", params=(50000,), plan=r"USING COVERING INDEX idx_venues_capacity"),
+5: Query("Team wins (requires winner_team_id)",
 """
 SELECT t.name, COUNT(*) AS wins
 FROM matches m
 JOIN teams t ON t.id = m.winner_team_id
 GROUP BY t.id
 ORDER BY wins DESC;
-"""),
-6: ("Player count by role",
+""", plan=r"USING COVERING INDEX idx_matches_winner_venue"),
+6: Query("Player count by role",
 """
-SELECT role, COUNT(*) AS count_players
-FROM players
-GROUP BY role
+SELECT role, n AS count_players
+FROM player_role_counts
 ORDER BY count_players DESC;
 """),
-7: ("Highest score per format (sample / placeholder)",
+7: Query("Highest score per format (sample / placeholder)",
 """
 SELECT format, MAX(runs) AS highest_runs
 FROM player_stats
 GROUP BY format;
 """),
-8: ("Series started in 2024 (placeholder - depends on series table)",
-"""
-SELECT 'Add a series table to use this query' AS note;
-"""),
-9: ("All-rounders: >1000 runs & >50 wickets",
+8: Query("Series started in 2024 (placeholder - depends on series table)", None,
+"Add a series table to use this query"),
+9: Query("All-rounders: >1000 runs & >50 wickets",
 """
 SELECT p.name, ps.format, ps.runs, ps.wickets
 FROM player_stats ps
 JOIN players p ON p.id = ps.player_id
 WHERE ps.runs > 1000 AND ps.wickets > 50;
-"""),
-10: ("Last 20 completed matches",
+""", plan=r"(SEARCH|SCAN) ps USING (COVERING )?INDEX"),  # idx_allrounders or the player join index, depending on stats
+10: Query("Last 20 completed matches",
 """
 SELECT m.description, t1.name AS team1, t2.name AS team2, t3.name AS winner, m.victory_margin, m.victory_type, v.name AS venue
 FROM matches m
@@ -77,102 +101,549 @@ WHERE m.winner_team_id IS NOT NULL
 ORDER BY m.start_time DESC
 LIMIT 20;
 """),
-11: ("Player performance across formats",
+11: Query("Player performance across formats",
 """
-SELECT p.name,
-       SUM(CASE WHEN ps.format='Test' THEN ps.runs ELSE 0 END) AS test_runs,
-       SUM(CASE WHEN ps.format='ODI' THEN ps.runs ELSE 0 END) AS odi_runs,
-       SUM(CASE WHEN ps.format='T20I' THEN ps.runs ELSE 0 END) AS t20_runs,
-       ROUND(AVG(ps.average), 2) AS overall_avg
-FROM players p
-JOIN player_stats ps ON p.id = ps.player_id
-GROUP BY p.id
-HAVING ( (test_runs>0) + (odi_runs>0) + (t20_runs>0) ) >= 2;
+SELECT p.name, t.test_runs, t.odi_runs, t.t20_runs, ROUND(t.overall_avg, 2) AS overall_avg
+FROM mv_player_stats_totals t
+JOIN players p ON p.id = t.player_id
+WHERE t.formats_with_runs >= 2
+ORDER BY t.player_id;
 """),
-12: ("Home vs Away wins (simplified)",
+12: Query("Home vs Away wins (simplified)",
 """
-SELECT t.name AS team, SUM(CASE WHEN v.country = t.country THEN 1 ELSE 0 END) AS home_wins,
-       SUM(CASE WHEN v.country <> t.country THEN 1 ELSE 0 END) AS away_wins
+SELECT t.name AS team, COALESCE(SUM(m.is_home), 0) AS home_wins,
+       COUNT(m.is_home) - COALESCE(SUM(m.is_home), 0) AS away_wins
 FROM matches m
 JOIN teams t ON t.id = m.winner_team_id
 JOIN venues v ON v.id = m.venue_id
+WHERE m.winner_team_id IS NOT NULL
 GROUP BY t.id;
-"""),
-13: ("Batting partnerships (placeholder - needs ball-by-ball)",
-"""
-SELECT 'Requires innings/partnership tables' AS note;
-"""),
-14: ("Bowling performance per venue (placeholder)",
-"""
-SELECT 'Requires per-match bowling numbers' AS note;
-"""),
-15: ("Clutch performance in close matches (placeholder)",
-"""
-SELECT 'Requires per-match player batting details' AS note;
-"""),
-16: ("Yearly batting trends since 2020 (placeholder)",
-"""
-SELECT 'Requires per-match batting with dates' AS note;
-"""),
-17: ("Toss advantage (placeholder)",
-"""
-SELECT 'Add toss columns to matches to enable' AS note;
-"""),
-18: ("Most economical bowlers (limited overs)",
+""", plan=r"USING COVERING INDEX idx_matches_winner_venue"),
+13: Query("Batting partnerships (placeholder - needs ball-by-ball)", None,
+"Requires innings/partnership tables"),
+14: Query("Bowling performance per venue (placeholder)", None,
+"Requires per-match bowling numbers"),
+15: Query("Clutch performance in close matches (placeholder)", None,
+"Requires per-match player batting details"),
+16: Query("Yearly batting trends since 2020 (placeholder)", None,
+"Requires per-match batting with dates"),
+17: Query("Toss advantage (placeholder)", None,
+"Add toss columns to matches to enable"),
+18: Query("Most economical bowlers (limited overs)",
 """
 SELECT p.name, ps.format, ps.economy, ps.wickets
 FROM player_stats ps
 JOIN players p ON p.id = ps.player_id
-WHERE ps.format IN ('ODI','T20I') AND ps.matches >= 10
+WHERE ps.format IN ('ODI','T20I') AND ps.matches >= ?
 ORDER BY ps.economy ASC, ps.wickets DESC
-LIMIT 20;
-"""),
-19: ("Consistency (avg & stddev placeholder)",
+LIMIT ?;
+""", params=(10, 20), plan=r"USING COVERING INDEX idx_ps_econ(?!.*TEMP B-TREE)"),
+19: Query("Consistency (avg & stddev placeholder)", None,
+"SQLite stddev requires extension or custom UDF"),
+20: Query("Matches played & batting avg by format (min 20 total)",
 """
-SELECT 'SQLite stddev requires extension or custom UDF' AS note;
+SELECT p.name, t.test_matches, t.odi_matches, t.t20_matches, ROUND(t.overall_avg, 2) AS avg_batting
+FROM mv_player_stats_totals t
+JOIN players p ON p.id = t.player_id
+WHERE t.total_matches >= 20
+ORDER BY t.player_id;
 """),
-20: ("Matches played & batting avg by format (min 20 total)",
+21: Query("Weighted performance score",
 """
-WITH totals AS (
-  SELECT player_id, SUM(matches) AS total_matches
+SELECT p.name, s.format, s.score
+FROM mv_weighted_scores s
+JOIN players p ON p.id = s.player_id
+ORDER BY s.score DESC
+LIMIT ?;
+""", params=(50,), plan=r"USING INDEX idx_mv_weighted_scores_score(?!.*TEMP B-TREE)"),
+22: Query("Head-to-head prediction base (placeholder)", None,
+"Requires match results by pair & toss/venue context"),
+23: Query("Recent form (placeholder)", None,
+"Requires last N innings per player"),
+24: Query("Successful batting pairs (placeholder)", None,
+"Requires partnership table"),
+25: Query("Quarterly performance evolution (placeholder)", None,
+"Requires dated per-innings data"),
+}
+
+# Query 21's per-row score over player_stats columns, shared by its roll-up and fallback
+WEIGHTED_SCORE = """((runs * 0.01) + (COALESCE(average,0) * 0.5) + (COALESCE(strike_rate,0) * 0.3)) +
+       ((wickets * 2) + ((50 - COALESCE(NULLIF(average,0),50)) * 0.5) + ((6 - COALESCE(economy,6)) * 2))"""
+
+# Roll-up tables that stand in for materialized views (SQLite has none):
+# {table: (DDL statements, SELECT that fills it)}. Rebuilt by refresh_mv().
+MV_SQL: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "mv_player_stats_totals": (
+        (
+            """CREATE TABLE IF NOT EXISTS mv_player_stats_totals (
+  player_id INTEGER PRIMARY KEY,
+  test_runs INTEGER, odi_runs INTEGER, t20_runs INTEGER,
+  test_matches INTEGER, odi_matches INTEGER, t20_matches INTEGER,
+  total_matches INTEGER, formats_with_runs INTEGER, overall_avg REAL,
+  best_avg REAL, best_sr REAL, best_econ REAL
+)""",
+        ),
+        """
+WITH agg AS (
+  SELECT player_id, format, SUM(runs) AS runs, SUM(matches) AS matches,
+         SUM(average) AS avg_sum, COUNT(average) AS avg_n,
+         MAX(average) AS best_avg, MAX(strike_rate) AS best_sr, MIN(economy) AS best_econ
   FROM player_stats
-  GROUP BY player_id
+  GROUP BY player_id, format
 )
+SELECT player_id,
+       COALESCE(MAX(CASE format WHEN 'Test' THEN runs END), 0),
+       COALESCE(MAX(CASE format WHEN 'ODI' THEN runs END), 0),
+       COALESCE(MAX(CASE format WHEN 'T20I' THEN runs END), 0),
+       COALESCE(MAX(CASE format WHEN 'Test' THEN matches END), 0),
+       COALESCE(MAX(CASE format WHEN 'ODI' THEN matches END), 0),
+       COALESCE(MAX(CASE format WHEN 'T20I' THEN matches END), 0),
+       SUM(matches),
+       SUM(format IN ('Test','ODI','T20I') AND runs > 0),
+       SUM(avg_sum) * 1.0 / SUM(avg_n),
+       MAX(best_avg), MAX(best_sr), MIN(best_econ)
+FROM agg
+GROUP BY player_id
+""",
+    ),
+    # Query 21's weighted score per stats row; the score index lets ORDER BY ... LIMIT 50
+    # walk the top of the index instead of scoring and sorting every row
+    "mv_weighted_scores": (
+        (
+            """CREATE TABLE IF NOT EXISTS mv_weighted_scores (
+  stat_id INTEGER PRIMARY KEY,
+  player_id INTEGER,
+  format TEXT,
+  score REAL
+)""",
+            "CREATE INDEX IF NOT EXISTS idx_mv_weighted_scores_score ON mv_weighted_scores(score DESC)",
+        ),
+        f"""
+SELECT id, player_id, format, {WEIGHTED_SCORE}
+FROM player_stats
+""",
+    ),
+}
+
+# mv_state.stale flips to 1 on any player_stats write and back to 0 once every
+# MV_SQL table has been rebuilt, so readers can tell when the roll-ups lag behind
+MV_STATE_DDL = [
+    "CREATE TABLE IF NOT EXISTS mv_state (id INTEGER PRIMARY KEY CHECK (id = 1), stale INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO mv_state (id, stale) VALUES (1, 1)",
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_player_stats_mv_{op.lower()} AFTER {op} ON player_stats BEGIN
+  UPDATE mv_state SET stale = 1 WHERE stale = 0;
+END"""
+    for op in ("INSERT", "UPDATE", "DELETE")
+]
+
+def refresh_mv(conn: sqlite3.Connection) -> None:
+    """Rebuild every MV_SQL table from player_stats; run after stats are loaded or changed"""
+    try:
+        with conn:
+            for stmt in MV_STATE_DDL:
+                conn.execute(stmt)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Skipping mv_state setup ({e})")
+        return
+    refreshed = True
+    for table, (ddl, select_sql) in MV_SQL.items():
+        try:
+            with conn:
+                for stmt in ddl:
+                    conn.execute(stmt)
+                conn.execute(f"DELETE FROM {table}")
+                conn.execute(f"INSERT INTO {table} {select_sql}")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Skipping {table} refresh ({e})")
+            refreshed = False
+    if refreshed:
+        with conn:
+            conn.execute("UPDATE mv_state SET stale = 0")
+
+def mv_is_stale(conn: sqlite3.Connection) -> bool:
+    """True when player_stats has changed since the last complete refresh_mv()"""
+    try:
+        row = conn.execute("SELECT stale FROM mv_state").fetchone()
+    except sqlite3.OperationalError:
+        return True
+    return row is None or bool(row[0])
+
+# Base-table SQL (with params) for queries that read an MV_SQL roll-up, run instead
+# of the roll-up read while mv_is_stale(); same columns and rows as a fresh roll-up
+MV_FALLBACK: Dict[int, Tuple[str, tuple]] = {
+    20: ("""
 SELECT p.name,
-  SUM(CASE WHEN ps.format='Test' THEN ps.matches ELSE 0 END) AS test_matches,
-  SUM(CASE WHEN ps.format='ODI' THEN ps.matches ELSE 0 END) AS odi_matches,
-  SUM(CASE WHEN ps.format='T20I' THEN ps.matches ELSE 0 END) AS t20_matches,
-  ROUND(AVG(CASE WHEN ps.average IS NOT NULL THEN ps.average END),2) AS avg_batting
+       SUM(CASE WHEN ps.format = 'Test' THEN ps.matches ELSE 0 END) AS test_matches,
+       SUM(CASE WHEN ps.format = 'ODI' THEN ps.matches ELSE 0 END) AS odi_matches,
+       SUM(CASE WHEN ps.format = 'T20I' THEN ps.matches ELSE 0 END) AS t20_matches,
+       ROUND(AVG(ps.average), 2) AS avg_batting
 FROM players p
 JOIN player_stats ps ON p.id = ps.player_id
-JOIN totals t ON t.player_id = p.id
-WHERE t.total_matches >= 20
-GROUP BY p.id;
-"""),
-21: ("Weighted performance score",
-"""
-SELECT p.name, ps.format,
-       ((ps.runs * 0.01) + (COALESCE(ps.average,0) * 0.5) + (COALESCE(ps.strike_rate,0) * 0.3)) +
-       ((ps.wickets * 2) + ((50 - COALESCE(NULLIF(ps.average,0),50)) * 0.5) + ((6 - COALESCE(ps.economy,6)) * 2)) AS score
+GROUP BY p.id
+HAVING SUM(ps.matches) >= 20
+ORDER BY p.id
+""".strip(), ()),
+    21: (f"""
+SELECT p.name, ps.format, {WEIGHTED_SCORE} AS score
 FROM player_stats ps
 JOIN players p ON p.id = ps.player_id
 ORDER BY score DESC
-LIMIT 50;
-"""),
-22: ("Head-to-head prediction base (placeholder)",
-"""
-SELECT 'Requires match results by pair & toss/venue context' AS note;
-"""),
-23: ("Recent form (placeholder)",
-"""
-SELECT 'Requires last N innings per player' AS note;
-"""),
-24: ("Successful batting pairs (placeholder)",
-"""
-SELECT 'Requires partnership table' AS note;
-"""),
-25: ("Quarterly performance evolution (placeholder)",
-"""
-SELECT 'Requires dated per-innings data' AS note;
-"""),
+LIMIT ?
+""".strip(), QUERIES[21].params),
+}
+
+# Query 11 computed straight from player_stats, for while mv_player_stats_totals
+# is stale. Its three per-format sums and the overall average are independent
+# GROUP BYs, run side by side on their own read-only connections (SQLite allows
+# concurrent readers and releases the GIL while stepping) and merged by player id.
+Q11_FORMAT_RUNS = "SELECT player_id, SUM(runs) FROM player_stats WHERE format = ? GROUP BY player_id"
+Q11_FORMATS = ("Test", "ODI", "T20I")
+Q11_AVG = """SELECT p.id, p.name, ROUND(AVG(ps.average), 2)
+FROM players p
+JOIN player_stats ps ON p.id = ps.player_id
+GROUP BY p.id"""
+Q11_COLUMNS = ["name", "test_runs", "odi_runs", "t20_runs", "overall_avg"]
+
+_query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sql-query")
+
+def _read_only(db_path: str, sql: str, params: tuple = ()) -> List[tuple]:
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def run_query_11_split(db_path: str) -> Tuple[List[str], List[tuple]]:
+    """Query 11's (columns, rows) from four concurrent GROUP BYs over player_stats"""
+    runs = [_query_executor.submit(_read_only, db_path, Q11_FORMAT_RUNS, (fmt,)) for fmt in Q11_FORMATS]
+    averages = _query_executor.submit(_read_only, db_path, Q11_AVG)
+    per_format = [dict(f.result()) for f in runs]
+    rows = []
+    for player_id, name, overall_avg in sorted(averages.result()):
+        totals = [by_player.get(player_id) or 0 for by_player in per_format]
+        if sum(total > 0 for total in totals) >= 2:
+            rows.append((name, *totals, overall_avg))
+    return Q11_COLUMNS, rows
+
+# Subexpressions shared by several queries, prepended by report_sql() in report mode.
+# psp is the player_stats JOIN players that Queries 3, 9, 18 and 21 all start from.
+COMMON_CTES = {
+    "psp": "SELECT p.name, ps.* FROM player_stats ps JOIN players p ON p.id = ps.player_id",
+}
+
+# Queries 3, 9, 18 and 21 restated over psp in one column layout so that report
+# mode can UNION ALL them behind a single WITH and scan the join once. seq keeps
+# each query's own row order; REPORT_VIEWS maps the layout back to its columns.
+REPORT_COLUMNS = ["query_id", "seq", "name", "format", "runs", "average", "wickets", "economy", "score"]
+REPORT_QUERIES = {
+3: """SELECT 3, ROW_NUMBER() OVER (ORDER BY runs DESC), name, format, runs, average, NULL, NULL, NULL
+FROM psp WHERE format = 'ODI' ORDER BY runs DESC LIMIT 10""",
+9: """SELECT 9, ROW_NUMBER() OVER (), name, format, runs, NULL, wickets, NULL, NULL
+FROM psp WHERE runs > 1000 AND wickets > 50""",
+18: """SELECT 18, ROW_NUMBER() OVER (ORDER BY economy ASC, wickets DESC), name, format, NULL, NULL, wickets, economy, NULL
+FROM psp WHERE format IN ('ODI','T20I') AND matches >= 10 ORDER BY economy ASC, wickets DESC LIMIT 20""",
+21: """SELECT 21, ROW_NUMBER() OVER (ORDER BY score DESC), name, format, NULL, NULL, NULL, NULL, score
+FROM (SELECT name, format,
+             ((runs * 0.01) + (COALESCE(average,0) * 0.5) + (COALESCE(strike_rate,0) * 0.3)) +
+             ((wickets * 2) + ((50 - COALESCE(NULLIF(average,0),50)) * 0.5) + ((6 - COALESCE(economy,6)) * 2)) AS score
+      FROM psp)
+ORDER BY score DESC LIMIT 50""",
+}
+REPORT_VIEWS = {
+    3: {"name": "name", "runs": "total_runs", "average": "batting_average"},
+    9: {"name": "name", "format": "format", "runs": "runs", "wickets": "wickets"},
+    18: {"name": "name", "format": "format", "economy": "economy", "wickets": "wickets"},
+    21: {"name": "name", "format": "format", "score": "score"},
+}
+
+def report_sql() -> str:
+    """All REPORT_QUERIES in one statement: a single WITH psp feeding a UNION ALL"""
+    union = "\nUNION ALL\n".join(f"SELECT * FROM ({sql})" for sql in REPORT_QUERIES.values())
+    return f"WITH psp AS ({COMMON_CTES['psp']})\nSELECT * FROM ({union})\nORDER BY 1, 2"
+
+def run_report(conn: sqlite3.Connection) -> Dict[int, Tuple[List[str], List[tuple]]]:
+    """Run report_sql() once and split it back into {query_id: (columns, rows)} with each query's own columns"""
+    positions = {col: i for i, col in enumerate(REPORT_COLUMNS)}
+    results = {qid: (list(view.values()), []) for qid, view in REPORT_VIEWS.items()}
+    for row in conn.execute(report_sql()):
+        qid = row[0]
+        results[qid][1].append(tuple(row[positions[col]] for col in REPORT_VIEWS[qid]))
+    return results
+
+# (sql, params) per query id, built once at import. sqlite3's per-connection
+# statement cache is keyed on the SQL text, so always handing out the same string
+# (with values bound separately) means each canned query is prepared once per
+# connection and reused on every later run. Literals that a partial index's WHERE
+# has to match (Query 9's thresholds, Query 18's format list) stay in the SQL.
+_PREPARED: Dict[int, Tuple[str, tuple]] = {qid: (q.sql.strip(), q.params) for qid, q in QUERIES.items() if not q.is_placeholder}
+
+def get_prepared(qid: int) -> Tuple[str, tuple]:
+    """SQL text and bound parameters for a canned (non-placeholder) query, ready for conn.execute(*get_prepared(qid))"""
+    return _PREPARED[qid]
+
+# Queries that never read `matches` only change when the database file does, so
+# their rows are memoized per (connection, query, file mtime). Match results move
+# with every scrape and always go to SQLite.
+def _reads_matches(sql: str) -> bool:
+    # The table, not player_stats.matches (the column Queries 18 and 20 filter on)
+    return re.search(r"\b(?:FROM|JOIN)\s+matches\b", sql, re.IGNORECASE) is not None
+
+CACHEABLE_IDS = frozenset(qid for qid, (sql, _) in _PREPARED.items() if not _reads_matches(sql))
+
+def db_mtime(db_path: str) -> float:
+    """Last write time of the database; in WAL mode commits land in the -wal file first"""
+    return max(os.path.getmtime(p) for p in (db_path, f"{db_path}-wal") if os.path.exists(p))
+
+@functools.lru_cache(maxsize=64)
+def run_cached(conn: sqlite3.Connection, key: Union[int, Tuple[int, ...]], mtime: float) -> Tuple[Tuple[str, ...], Tuple[tuple, ...]]:
+    """
+    (columns, rows) of a CACHEABLE_IDS query id or CACHEABLE_COMBINED key, frozen so
+    the cached value can't be mutated; pass db_mtime() as mtime
+    """
+    if isinstance(key, int):
+        cur = conn.execute(*get_prepared(key))
+    else:
+        cur = conn.execute(QUERIES_COMBINED[key].sql, QUERIES_COMBINED[key].params)
+    return tuple(d[0] for d in cur.description), tuple(cur.fetchall())
+
+# Every query that actually reads tables. Those without bound parameters are
+# materialized into temp.r<id> by one executescript call (which can't bind values)
+# and then read back as plain tables; the rest run as their prepared statements.
+RUN_ALL_IDS = [qid for qid, q in QUERIES.items() if not q.is_placeholder]
+SCRIPT_IDS = [qid for qid in RUN_ALL_IDS if not QUERIES[qid].params]
+ALL_SQL = "\n".join(
+    f"DROP TABLE IF EXISTS temp.r{qid};\nCREATE TEMP TABLE r{qid} AS {QUERIES[qid].sql.strip().rstrip(';')};"
+    for qid in SCRIPT_IDS
+)
+_run_all_lock = threading.Lock()
+
+def run_all(conn: sqlite3.Connection) -> Dict[int, Tuple[List[str], List[tuple]]]:
+    """
+    Run every non-placeholder query in one batch; returns {query_id: (columns, rows)}
+    for all queries, placeholders answered with their note without touching SQLite.
+    """
+    results = {qid: (["note"], [(q.note,)]) for qid, q in QUERIES.items() if q.is_placeholder}
+    # The temp tables live on the connection, which the app shares between sessions
+    with _run_all_lock:
+        try:
+            conn.executescript(ALL_SQL)
+            for qid in RUN_ALL_IDS:
+                if qid in SCRIPT_IDS:
+                    cur = conn.execute(f"SELECT * FROM temp.r{qid}")
+                else:
+                    cur = conn.execute(*get_prepared(qid))
+                results[qid] = ([d[0] for d in cur.description], cur.fetchall())
+        finally:
+            conn.executescript("".join(f"DROP TABLE IF EXISTS temp.r{qid};" for qid in SCRIPT_IDS))
+    return dict(sorted(results.items()))
+
+
+# matches.is_home: 1 when the winner's country is the venue's country, 0 when it
+# isn't, NULL when either is unknown. Lets Query 12 sum an integer instead of
+# comparing two strings per row; the triggers keep it current on every write.
+IS_HOME_EXPR = "(SELECT v.country = t.country FROM venues v, teams t WHERE v.id = {m}.venue_id AND t.id = {m}.winner_team_id)"
+IS_HOME_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_matches_is_home_ins AFTER INSERT ON matches BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="NEW")} WHERE id = NEW.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_matches_is_home_upd AFTER UPDATE OF winner_team_id, venue_id ON matches BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="NEW")} WHERE id = NEW.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_venues_is_home AFTER UPDATE OF country ON venues BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="matches")} WHERE venue_id = NEW.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_teams_is_home AFTER UPDATE OF country ON teams BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="matches")} WHERE winner_team_id = NEW.id;
+END""",
+    # A match can be stored before its venue or winning team row exists
+    f"""CREATE TRIGGER IF NOT EXISTS trg_venues_is_home_ins AFTER INSERT ON venues BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="matches")} WHERE venue_id = NEW.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_teams_is_home_ins AFTER INSERT ON teams BEGIN
+  UPDATE matches SET is_home = {IS_HOME_EXPR.format(m="matches")} WHERE winner_team_id = NEW.id;
+END""",
+]
+
+def ensure_is_home(conn: sqlite3.Connection) -> None:
+    """Add matches.is_home on first run, (re)create its triggers and fill any rows still NULL"""
+    try:
+        with conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(matches)")}
+            if columns and "is_home" not in columns:
+                conn.execute("ALTER TABLE matches ADD COLUMN is_home INTEGER")
+            if columns:
+                for ddl in IS_HOME_TRIGGERS:
+                    conn.execute(ddl)
+                # Catches rows written while the triggers were missing (e.g. by another tool)
+                conn.execute(f"UPDATE matches SET is_home = {IS_HOME_EXPR.format(m='matches')} WHERE is_home IS NULL")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Skipping matches.is_home setup ({e})")
+
+# player_role_counts: Query 6's COUNT(*) per role, kept current by triggers on
+# players so the query reads a handful of rows instead of scanning every player.
+# role may be NULL, hence IS comparisons and a row dropped once its count hits 0.
+ROLE_COUNTS_DDL = [
+    "CREATE TABLE IF NOT EXISTS player_role_counts (role TEXT, n INTEGER NOT NULL)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_player_role_counts_role ON player_role_counts(role)",
+]
+_ROLE_COUNT_ADD = """INSERT INTO player_role_counts (role, n) SELECT {r}, 0
+  WHERE NOT EXISTS (SELECT 1 FROM player_role_counts WHERE role IS {r});
+  UPDATE player_role_counts SET n = n + 1 WHERE role IS {r};"""
+_ROLE_COUNT_SUB = """UPDATE player_role_counts SET n = n - 1 WHERE role IS {r};
+  DELETE FROM player_role_counts WHERE role IS {r} AND n <= 0;"""
+ROLE_COUNTS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_players_role_ins AFTER INSERT ON players BEGIN
+  {_ROLE_COUNT_ADD.format(r="NEW.role")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_players_role_del AFTER DELETE ON players BEGIN
+  {_ROLE_COUNT_SUB.format(r="OLD.role")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_players_role_upd AFTER UPDATE OF role ON players
+WHEN OLD.role IS NOT NEW.role BEGIN
+  {_ROLE_COUNT_SUB.format(r="OLD.role")}
+  {_ROLE_COUNT_ADD.format(r="NEW.role")}
+END""",
+]
+
+def ensure_role_counts(conn: sqlite3.Connection) -> None:
+    """Create player_role_counts and its triggers, recounting from players in case it was written without them"""
+    try:
+        with conn:
+            for ddl in ROLE_COUNTS_DDL + ROLE_COUNTS_TRIGGERS:
+                conn.execute(ddl)
+            conn.execute("DELETE FROM player_role_counts")
+            conn.execute("INSERT INTO player_role_counts (role, n) SELECT role, COUNT(*) FROM players GROUP BY role")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Skipping player_role_counts setup ({e})")
+
+# Queries answered together from one scan. Each member's result is a slice of the
+# combined rows: filter with `where` (a DataFrame.query expression), reorder by
+# `order_by`, then keep/rename `columns` ({combined column: output column}).
+class Slice(NamedTuple):
+    columns: Dict[str, str]
+    where: Optional[str] = None
+    order_by: Optional[str] = None
+
+class CombinedQuery(NamedTuple):
+    sql: str
+    slices: Dict[int, Slice]
+    params: tuple = ()
+
+QUERIES_COMBINED: Dict[Tuple[int, ...], CombinedQuery] = {
+    # Query 5 (wins per team) and Query 12 (those wins split home/away) both group
+    # matches by winner; one pass yields both. Query 12 only counts matches whose
+    # venue row exists, hence venue_matches.
+    (5, 12): CombinedQuery(
+        """
+SELECT t.id AS team_id, t.name AS team, COUNT(*) AS wins, COUNT(v.id) AS venue_matches,
+       COALESCE(SUM(CASE WHEN v.id IS NOT NULL THEN m.is_home END), 0) AS home_wins,
+       COUNT(CASE WHEN v.id IS NOT NULL THEN m.is_home END)
+         - COALESCE(SUM(CASE WHEN v.id IS NOT NULL THEN m.is_home END), 0) AS away_wins
+FROM matches m
+JOIN teams t ON t.id = m.winner_team_id
+LEFT JOIN venues v ON v.id = m.venue_id
+WHERE m.winner_team_id IS NOT NULL
+GROUP BY t.id
+ORDER BY wins DESC;
+""",
+        {
+            5: Slice({"team": "name", "wins": "wins"}),
+            12: Slice({"team": "team", "home_wins": "home_wins", "away_wins": "away_wins"},
+                      where="venue_matches > 0", order_by="team_id"),
+        },
+    ),
+    # Query 3 (top ODI scorers) and Query 7 (best score per format) both rank
+    # player_stats by runs within a format. Query 3 only ranks rows whose player
+    # exists, Query 7 ranks every row, hence the LEFT JOIN and the two row numbers.
+    (3, 7): CombinedQuery(
+        """
+WITH ranked AS (
+  SELECT ps.format, p.name, ps.runs, ps.average,
+         (ps.format = ? AND p.id IS NOT NULL) AS in_q3,
+         ROW_NUMBER() OVER (PARTITION BY ps.format, p.id IS NULL ORDER BY ps.runs DESC) AS rn,
+         ROW_NUMBER() OVER (PARTITION BY ps.format ORDER BY ps.runs DESC) AS format_rank
+  FROM player_stats ps
+  LEFT JOIN players p ON p.id = ps.player_id
+)
+SELECT * FROM ranked
+WHERE (in_q3 AND rn <= ?) OR format_rank = 1;
+""",
+        {
+            3: Slice({"name": "name", "runs": "total_runs", "average": "batting_average"},
+                     where="in_q3 == 1", order_by="rn"),
+            7: Slice({"format": "format", "runs": "highest_runs"}, where="format_rank == 1", order_by="format"),
+        },
+        params=QUERIES[3].params,
+    ),
 }
+# query id -> key of the combined query that serves it
+COMBINED_BY_QUERY = {qid: ids for ids, combo in QUERIES_COMBINED.items() for qid in combo.slices}
+CACHEABLE_COMBINED = frozenset(ids for ids, combo in QUERIES_COMBINED.items() if not _reads_matches(combo.sql))
+
+# Indexes for the join/filter columns used above; applied once when the analytics
+# connection is opened so the joins become index lookups instead of full scans
+INDEXES = [
+    # (player_id, format) serves the per-player joins and the per-format roll-ups;
+    # it supersedes the single-column player_id index
+    "CREATE INDEX IF NOT EXISTS idx_ps_player_format ON player_stats(player_id, format)",
+    "DROP INDEX IF EXISTS idx_ps_player",
+    "CREATE INDEX IF NOT EXISTS idx_ps_format ON player_stats(format)",
+    # Query 2's 30-day window and Query 10's newest-first walk
+    "CREATE INDEX IF NOT EXISTS idx_matches_start_time ON matches(start_time DESC)",
+    "DROP INDEX IF EXISTS idx_m_start",
+    # Only decided matches, for the winner joins in Queries 5, 10 and 12. Carrying
+    # venue_id and is_home (added by ensure_is_home() first) makes the per-winner
+    # walk index-only; the venue check is then one rowid lookup per match. The
+    # queries repeat the IS NOT NULL so the partial index is provably usable.
+    "CREATE INDEX IF NOT EXISTS idx_matches_winner_venue ON matches(winner_team_id, venue_id, is_home) WHERE winner_team_id IS NOT NULL",
+    "DROP INDEX IF EXISTS idx_matches_winner",
+    # Covering indexes: Query 1 (country = ? ORDER BY name) and Query 4
+    # (capacity > ? ORDER BY capacity DESC) read rows pre-sorted from the index alone
+    "CREATE INDEX IF NOT EXISTS idx_players_country_name ON players(country, name, role, batting_style, bowling_style)",
+    "DROP INDEX IF EXISTS idx_p_country",
+    "CREATE INDEX IF NOT EXISTS idx_venues_capacity ON venues(capacity DESC, name, city, country)",
+    # Query 9's all-rounders only; the WHERE must match the query's literally for
+    # the planner to use it, and the index holds just the few qualifying rows
+    "CREATE INDEX IF NOT EXISTS idx_allrounders ON player_stats(player_id, format, runs, wickets) WHERE runs > 1000 AND wickets > 50",
+    # Query 18's top 20: economy-first keys hand rows out already in ORDER BY order,
+    # so the walk stops after 20 matches instead of sorting every ODI/T20I row
+    "CREATE INDEX IF NOT EXISTS idx_ps_econ ON player_stats(economy, wickets DESC, matches, player_id, format) WHERE format IN ('ODI','T20I')",
+]
+
+def verify_plans(conn: sqlite3.Connection) -> Dict[int, str]:
+    """
+    Check each query with an expected plan against EXPLAIN QUERY PLAN; logs and
+    returns {query_id: actual plan} for the ones that no longer match.
+    """
+    mismatches = {}
+    # sqlite3 caches the EXPLAIN statement by its text and doesn't re-plan it after
+    # an index is dropped, so tag the text with the schema version
+    version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    for qid, q in QUERIES.items():
+        if q.is_placeholder or q.plan is None:
+            continue
+        sql, params = get_prepared(qid)
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN /* schema {version} */ {sql}", params)
+            plan = "; ".join(row[3] for row in rows)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Skipping plan check for query {qid} ({e})")
+            continue
+        if not re.search(q.plan, plan):
+            logger.warning(f"Query {qid} plan changed: expected /{q.plan}/, got: {plan}")
+            mismatches[qid] = plan
+    return mismatches
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
+    """Create INDEXES (skipping tables that don't exist yet) and refresh planner statistics"""
+    for ddl in INDEXES:
+        try:
+            conn.execute(ddl)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Skipping index ({e}): {ddl}")
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        logger.warning(f"ANALYZE failed: {e}")